@@ -5,11 +5,105 @@ class Settings(BaseSettings):
     debug: bool = True
     base_url: str = "https://tecoxp.skedway.com"
     database_url: str = "sqlite:///./parking_system.db"
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    sqlite_synchronous: str = "NORMAL"  # Con WAL, NORMAL evita un fsync por commit
+    sqlite_busy_timeout: float = 10  # Segundos esperando un lock antes de fallar
     max_workers: int = 1  # Número máximo de trabajadores concurrentes
+    shutdown_drain_timeout: int = 60  # Segundos para terminar tareas pendientes al apagar
+    
+    # Planificador de la cola: booking > search > prefetch
+    scheduler_aging_seconds: float = 30  # Cada N segundos en cola la tarea sube un nivel (0 = sin envejecimiento)
+    scheduler_deadline_horizon: float = 30  # Tareas con plazo a menos de N segundos pasan adelante
+    
+    # Pool de navegadores precalentados
+    driver_pool_size: int = 1  # Navegadores mantenidos abiertos en booking.php
+    driver_max_uses: int = 20  # Reciclar un navegador después de N tareas
+    driver_checkout_timeout: int = 120  # Segundos máximos esperando un navegador libre
+    
+    # Pisos recorridos en paralelo por búsqueda (1 = secuencial). Los navegadores extra
+    # salen del pool: driver_pool_size debería ser >= max_workers * floor_scan_concurrency
+    floor_scan_concurrency: int = 1
+    
+    # Navegación del listado con Selenium: "url" carga cada piso/página por URL,
+    # "click" usa los filtros y la paginación de la interfaz
+    search_navigation: str = "url"
+    
+    # Lectura de los espacios: "dom" (script sobre el listado) o "xhr" (respuestas JSON
+    # capturadas de los logs de performance; si no hay una reconocible, se usa el DOM)
+    search_capture: str = "dom"
+    xhr_capture_url_patterns: list = ["booking", "schedule", "availability", "space"]
+    xhr_capture_wait: float = 2  # Segundos máximos esperando que termine el XHR antes de caer al DOM
+    
+    # Persistencia de la sesión de Skedway (cookies, localStorage y tour cerrado) entre
+    # navegadores del pool y reinicios
+    session_persistence: bool = True
+    session_state_file: str = "~/.reserva_teco/session_state.json"  # Fuera del repo: contiene cookies de sesión
+    session_save_interval: int = 300  # Segundos mínimos entre guardados del estado
+    session_check_wait: float = 10  # Espera máxima de los filtros del listado al validar la sesión
+    
+    # Búsquedas por rango de fechas y varios edificios en una sola tarea
+    search_range_max_days: int = 14
+    search_range_max_combinations: int = 28  # Fechas x edificios
+    
+    # Motor de búsqueda: "selenium" (navegador) o "http" (descarga y parseo del HTML)
+    search_engine: str = "selenium"
+    http_timeout: int = 20  # Segundos por request del motor HTTP
+    http_seed_cookies_from_browser: bool = True  # Copiar la sesión de un navegador del pool
+    
+    # Cache de resultados de búsqueda
+    availability_cache_ttl: int = 120  # Segundos de validez (0 = deshabilitado)
+    availability_cache_max_entries: int = 256
+    
+    # Snapshot persistente de disponibilidad
+    snapshot_enabled: bool = True
+    snapshot_ttl: int = 300  # Segundos durante los que un piso se responde desde la base
+    
+    # Guardar en cada tarea el desglose de tiempos por fase
+    store_task_timings: bool = True
+    
+    # Consulta de estado de tareas con espera (long-poll)
+    task_wait_max_seconds: int = 60  # Tope de ?wait= en GET /task/{task_id}
+    booking_batch_max_sessions: int = 2  # Navegadores del pool usados por una reserva en lote
+    booking_batch_max_items: int = 50
+    booking_sync_timeout: int = 180  # Espera máxima de POST /reserve en modo sync antes de responder 202
+    task_status_memory: int = 10000  # Estados recientes mantenidos en memoria para ETag y esperas
+    
+    # Timeouts adaptativos: percentil de la latencia observada de cada paso x multiplicador
+    adaptive_timeouts: bool = True
+    timeout_percentile: float = 0.99
+    timeout_multiplier: float = 2.0
+    timeout_min_seconds: float = 1.0
+    timeout_max_seconds: float = 30.0
+    timeout_min_samples: int = 20  # Hasta juntar N muestras cada paso usa su timeout fijo
+    timing_window: int = 200  # Latencias recientes guardadas por paso
+    
+    # Presupuesto de tiempo por tipo de tarea, compartido entre esperas y reintentos (0 = sin tope)
+    task_time_budgets: dict = {"search": 600, "booking": 150, "booking_batch": 1800, "search_and_book": 300}
+    retry_backoff_base: float = 0.5  # Segundos; se duplica en cada reintento, con jitter
+    retry_backoff_max: float = 8.0
+    
+    # Escritura de estados de tareas y retención
+    task_write_batch_interval: float = 0.05  # Segundos acumulando transiciones antes de escribirlas
+    task_write_batch_size: int = 200
+    task_write_attempts: int = 4  # Intentos por lote antes de descartarlo (p. ej. "database is locked")
+    task_result_retention_hours: int = 24  # Luego se borra el JSON de resultado (0 = nunca)
+    task_retention_days: int = 30  # Luego se eliminan las tareas terminadas (0 = nunca)
+    task_retention_interval: int = 3600  # Segundos entre pasadas de retención
     
     # Configuración de Chrome
+    chrome_headless: bool = True  # Agrega --headless=new si chrome_options no lo incluye
+    chrome_page_load_timeout: float = 30  # Timeout inicial de driver.get, luego adaptativo
+    chrome_page_load_strategy: str = "eager"  # "eager" no espera imágenes ni iframes; "normal" espera todo
+    chrome_block_assets: bool = True  # Bloquear imágenes, fuentes, media y hosts de terceros
+    chrome_blocked_urls: list = [
+        "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+        "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+        "*.mp4", "*.webm", "*.mp3",
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+        "*hotjar.com*", "*facebook.net*", "*fonts.googleapis.com*", "*fonts.gstatic.com*"
+    ]
     chrome_options: list = [
-        #"--headless",
         "--no-sandbox",
         "--disable-dev-shm-usage",
         "--disable-gpu",
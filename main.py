@@ -1,7 +1,17 @@
 # main.py
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from routers import availability, booking
 from config.settings import Settings
+from services.driver_pool import DriverPool
+from services.queue_service import QueueService
+from services.task_store import TaskStore
+from services.page_waits import WaitStats
+from services.availability_cache import AvailabilityCache
+from services.metrics import MetricsRegistry
+from services.xhr_capture import CaptureStats
+from services.session_store import SessionStore
+from services.timing_model import TimingModel
 import uvicorn
 
 settings = Settings()
@@ -25,13 +35,52 @@ app.include_router(
     tags=["booking"]
 )
 
+@app.on_event("startup")
+async def startup():
+    # Precalentar navegadores para que la primera tarea no pague el arranque de Chrome
+    DriverPool().warm_up()
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Drenar la cola antes de cerrar los navegadores que usan los trabajadores
+    QueueService().shutdown(drain=True, timeout=settings.shutdown_drain_timeout)
+    # Confirmar las transiciones de estado que quedaron en el lote
+    TaskStore().close(timeout=10)
+    DriverPool().close()
+
 @app.get("/")
 async def root():
     return {
         "app_name": settings.app_name,
         "version": "1.0.0",
-        "status": "running"
+        "status": "running",
+        "driver_pool": DriverPool().stats(),
+        "workers": QueueService().workers_status(),
+        "queue": QueueService().get_dispatch_stats(),
+        "search_coalescing": QueueService().get_coalescing_stats(),
+        "page_waits": WaitStats().snapshot(),
+        "availability_cache": AvailabilityCache().stats(),
+        "task_store": TaskStore().stats(),
+        "xhr_capture": CaptureStats().snapshot(),
+        "session": SessionStore().stats(),
+        "timing_model": TimingModel().snapshot()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métricas en formato de exposición de Prometheus"""
+    queue_service = QueueService()
+    return MetricsRegistry().render({
+        "reserva_driver_pool": DriverPool().stats(),
+        "reserva_queue": queue_service.get_dispatch_stats(),
+        "reserva_search_coalescing": queue_service.get_coalescing_stats(),
+        "reserva_availability_cache": AvailabilityCache().stats(),
+        "reserva_page_waits": WaitStats().snapshot(),
+        "reserva_task_store": TaskStore().stats(),
+        "reserva_xhr_capture": CaptureStats().snapshot(),
+        "reserva_session": SessionStore().stats(),
+        "reserva_timing_model": TimingModel().snapshot()
+    })
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=settings.debug)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, JSON
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, DateTime, JSON, Boolean, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -12,14 +12,104 @@ class Task(Base):
     
     id = Column(Integer, primary_key=True)
     task_id = Column(String, unique=True, index=True)
-    status = Column(String)  # PENDING, PROCESSING, COMPLETED, FAILED
+    status = Column(String, index=True)  # PENDING, PROCESSING, COMPLETED, FAILED
     request_type = Column(String)  # "search" or "booking"
     request_data = Column(JSON)
     result = Column(JSON, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    completed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    completed_at = Column(DateTime, nullable=True, index=True)
     error = Column(String, nullable=True)
+    result_fetched_at = Column(DateTime, nullable=True)  # Momento en que se obtuvo el resultado
+    from_cache = Column(Boolean, default=False)
+    coalesced_into = Column(String, nullable=True)  # task_id de la búsqueda idéntica que la resolvió
+    timings = Column(JSON, nullable=True)  # Desglose de tiempos por fase
+    partial = Column(JSON, nullable=True)  # Pisos o combinaciones con error si el resultado es parcial
+
+class AvailabilitySnapshot(Base):
+    """Bloque libre de 30 minutos de un espacio en una fecha"""
+    __tablename__ = "availability_snapshots"
+    
+    id = Column(Integer, primary_key=True)
+    booking_type = Column(String)  # "parking" o "desk"
+    building = Column(String)
+    date = Column(String)  # formato: "DD/MM/YYYY"
+    floor = Column(String)
+    space_id = Column(String)
+    space_name = Column(String)
+    page = Column(Integer)
+    block_start = Column(String)  # formato: "HH:MM"
+    block_end = Column(String)
+    scraped_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("booking_type", "building", "date", "space_id", "block_start"),
+        Index("ix_availability_snapshots_floor", "booking_type", "building", "date", "floor"),
+    )
+
+class FloorSnapshot(Base):
+    """Estado de refresco del snapshot de un piso en una fecha"""
+    __tablename__ = "floor_snapshots"
+    
+    id = Column(Integer, primary_key=True)
+    booking_type = Column(String)
+    building = Column(String)
+    date = Column(String)
+    floor = Column(String)
+    window_start = Column(String, nullable=True)  # Franja horaria cubierta por el último scrape
+    window_end = Column(String, nullable=True)
+    refreshed_at = Column(DateTime, nullable=True)  # None: piso conocido pero nunca leído con éxito
+    
+    __table_args__ = (
+        UniqueConstraint("booking_type", "building", "date", "floor"),
+    )
+
+def _create_engine():
+    if not settings.database_url.startswith("sqlite"):
+        return create_engine(
+            settings.database_url,
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_pre_ping=True
+        )
+    # Las sesiones se usan desde los threads de los trabajadores y del escritor de estados
+    return create_engine(
+        settings.database_url,
+        connect_args={"check_same_thread": False, "timeout": settings.sqlite_busy_timeout},
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow
+    )
+
+engine = _create_engine()
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _configure_sqlite(dbapi_connection, connection_record):
+        # WAL: las lecturas no bloquean al escritor; NORMAL alcanza con WAL
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout * 1000)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+def _add_missing_columns(table):
+    """
+    Agrega las columnas del modelo que faltan en una tabla ya existente
+
+    create_all no altera tablas existentes; las columnas nuevas son todas
+    nullable, así que alcanza con ALTER TABLE ADD COLUMN (idempotente).
+    """
+    existing = {column["name"] for column in inspect(engine).get_columns(table.name)}
+    with engine.begin() as connection:
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
 
-engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(bind=engine)
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+Base.metadata.create_all(bind=engine)
+_add_missing_columns(Task.__table__)
+# create_all no agrega índices a tablas existentes
+for index in Task.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
\ No newline at end of file
@@ -8,6 +8,9 @@ class SearchRequest(BaseModel):
     start_time: Optional[str] = "09:00"
     end_time: Optional[str] = "18:00"
     building: str
+    engine: Optional[str] = None  # "selenium" o "http"; por defecto Settings.search_engine
+    date_to: Optional[str] = None  # Último día (inclusive) para buscar un rango de fechas
+    buildings: Optional[List[str]] = None  # Varios edificios en la misma tarea; reemplaza a building
 
 class AvailableSlot(BaseModel):
     space_id: str
@@ -25,6 +28,22 @@ class BookingRequest(BaseModel):
     floor_id: str = "3311"
     base_type: str = "4"
 
+class BookingBatchRequest(BaseModel):
+    items: List[BookingRequest]
+    sessions: int = 1  # Navegadores en paralelo; tope Settings.booking_batch_max_sessions
+
+class SearchAndBookRequest(BaseModel):
+    title: str
+    booking_type: str = "parking"  # "parking" o "desk"
+    date: str  # formato: "DD/MM/YYYY"
+    start_time: Optional[str] = "09:00"
+    end_time: Optional[str] = "18:00"
+    building: str
+    building_id: Optional[str] = None  # Por defecto el de BookingRequest
+    max_attempts: int = 3  # Candidatos a probar si el formulario rechaza uno
+    max_pages: int = 2  # Páginas por piso a recorrer en la búsqueda
+    allow_partial: bool = False  # Reservar la mejor ventana si ningún espacio cubre la franja completa
+
 class BookingResponse(BaseModel):
     status: str
     message: str
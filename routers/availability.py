@@ -1,28 +1,108 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Query, Response
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from models.schemas import SearchRequest, AvailableSlot
 from services.availability_service import AvailabilityService
 from services.queue_service import QueueService
+from services.search_progress import ProgressStream
+import asyncio
+import json
 
 router = APIRouter()
 service = AvailabilityService()
 
 @router.post("/search")
-async def search_availability(request: SearchRequest):
+async def search_availability(
+    request: SearchRequest,
+    priority: Optional[str] = Query(None, description='"search" (default) o "prefetch"'),
+    deadline: Optional[float] = Query(None, gt=0, description="Segundos para empezar la búsqueda")
+):
     try:
+        if request.date_to or request.buildings:
+            # Validar el rango antes de encolar
+            service.expand_request(request)
         queue_service = QueueService()
-        task_id = await queue_service.add_task("search", request.dict())
+        task_id = await queue_service.add_task("search", request.dict(), priority=priority, deadline=deadline)
         return {"task_id": task_id, "message": "Task created successfully"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/search/stream")
+async def search_availability_stream(
+    request: SearchRequest,
+    priority: Optional[str] = Query(None, description='"search" (default) o "prefetch"'),
+    deadline: Optional[float] = Query(None, gt=0)
+):
+    """
+    Búsqueda con resultados parciales por Server-Sent Events
+
+    Emite un evento "task" con el task_id, un evento "batch" por cada página
+    analizada (espacios rankeados de esa página), un evento "partial" si algún
+    piso falló y un evento "summary" final con el ranking.
+    """
+    try:
+        if request.date_to or request.buildings:
+            service.expand_request(request)
+        stream = ProgressStream()
+        task_id = await QueueService().add_task(
+            "search", request.dict(), on_progress=stream.publish, priority=priority, deadline=deadline
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def events():
+        yield _sse("task", {"task_id": task_id})
+        while True:
+            try:
+                event, data = await stream.next_event(timeout=15)
+            except asyncio.TimeoutError:
+                # Mantener viva la conexión mientras se recorre el piso
+                yield ": keep-alive\n\n"
+                continue
+            yield _sse(event, data)
+            if event == "summary":
+                break
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/task/{task_id}")
-async def get_task_status(task_id: str):
+async def get_task_status(
+    task_id: str,
+    response: Response,
+    wait: Optional[float] = Query(None, ge=0, description="Segundos a esperar a que la tarea termine"),
+    if_none_match: Optional[str] = Header(None)
+):
     try:
         queue_service = QueueService()
+        if wait:
+            # Long-poll: responder apenas la tarea termina, sin consultar la base mientras tanto
+            await queue_service.wait_for_completion(task_id, min(wait, queue_service.max_status_wait))
+        
+        # Estado sin cambios respecto del que tiene el cliente: no tocar la base
+        etag = queue_service.status_etag(task_id)
+        if etag and if_none_match == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        
         result = await queue_service.get_task_status(task_id)
         if not result:
             raise HTTPException(status_code=404, detail="Task not found")
+        etag = queue_service.etag_for(task_id, result["status"])
+        if if_none_match == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,13 +1,83 @@
-from fastapi import APIRouter, HTTPException
-from models.schemas import BookingRequest, BookingResponse
-from services.booking_service import BookingService
+from fastapi import APIRouter, HTTPException, Header, Query, Response
+from fastapi.responses import JSONResponse
+from typing import Optional
+from models.schemas import BookingRequest, BookingResponse, BookingBatchRequest, SearchAndBookRequest
+from services.queue_service import QueueService
+from config.settings import Settings
+from routers.availability import get_task_status
 
 router = APIRouter()
-service = BookingService()
+settings = Settings()
 
-@router.post("/reserve", response_model=BookingResponse)
-async def make_reservation(request: BookingRequest):
+MODE_QUERY = Query("sync", pattern="^(sync|async)$", description='"sync" espera el resultado, "async" retorna el task_id')
+DEADLINE_QUERY = Query(None, gt=0, description="Segundos para empezar la reserva")
+
+async def _submit(request_type: str, request_data: dict, mode: str, deadline: Optional[float]):
+    """
+    Encola la tarea en un trabajador (el loop de la API no se bloquea) y, en modo
+    sync, espera su resultado
+    """
     try:
-        return await service.make_reservation(request)
+        queue_service = QueueService()
+        task_id = await queue_service.add_task(request_type, request_data, deadline=deadline)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+    accepted = {"task_id": task_id, "message": "Task created successfully"}
+    if mode == "async":
+        return JSONResponse(status_code=202, content=accepted)
+
+    status = await queue_service.wait_for_completion(task_id, settings.booking_sync_timeout)
+    if status not in ("COMPLETED", "FAILED"):
+        # Sigue en cola o en proceso: consultar GET /task/{task_id}
+        return JSONResponse(status_code=202, content=accepted)
+
+    result = await queue_service.get_task_status(task_id)
+    if status == "FAILED" or result["status"] == "FAILED":
+        # FAILED en memoria con la fila sin terminar: el resultado no se pudo guardar
+        raise HTTPException(status_code=500, detail=result.get("error") or "No se pudo guardar el resultado de la tarea")
+    return result["result"]
+
+@router.post("/reserve", response_model=BookingResponse)
+async def make_reservation(
+    request: BookingRequest,
+    mode: str = MODE_QUERY,
+    deadline: Optional[float] = DEADLINE_QUERY
+):
+    return await _submit("booking", request.dict(), mode, deadline)
+
+@router.post("/reserve/batch")
+async def make_reservations_batch(
+    request: BookingBatchRequest,
+    mode: str = MODE_QUERY,
+    deadline: Optional[float] = DEADLINE_QUERY
+):
+    """
+    Realiza varias reservas reutilizando una o pocas sesiones de navegador
+
+    Retorna el resultado de cada reserva en el orden recibido.
+    """
+    if len(request.items) > settings.booking_batch_max_items:
+        raise HTTPException(status_code=400, detail=f"El lote supera el máximo de {settings.booking_batch_max_items} reservas")
+    return await _submit("booking_batch", request.dict(), mode, deadline)
+
+@router.post("/search-and-book")
+async def search_and_book(
+    request: SearchAndBookRequest,
+    mode: str = MODE_QUERY,
+    deadline: Optional[float] = DEADLINE_QUERY
+):
+    """
+    Busca el mejor espacio y lo reserva en la misma sesión de navegador,
+    probando con el siguiente candidato si el formulario lo rechaza
+    """
+    return await _submit("search_and_book", request.dict(), mode, deadline)
+
+@router.get("/task/{task_id}")
+async def get_booking_status(
+    task_id: str,
+    response: Response,
+    wait: Optional[float] = Query(None, ge=0, description="Segundos a esperar a que la reserva termine"),
+    if_none_match: Optional[str] = Header(None)
+):
+    return await get_task_status(task_id, response, wait, if_none_match)
@@ -0,0 +1,131 @@
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+from typing import Optional, Tuple
+from config.settings import Settings
+import copy
+import logging
+import time
+
+class AvailabilityCache:
+    """
+    Cache LRU con TTL de resultados de búsqueda de disponibilidad.
+
+    La clave son los parámetros que determinan el resultado (tipo, fecha, edificio
+    y franja horaria). Las entradas de una fecha se invalidan cuando se confirma
+    una reserva para esa fecha.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # Solo inicializar una vez
+        if not self._initialized:
+            settings = Settings()
+            self.ttl = settings.availability_cache_ttl
+            self.max_entries = settings.availability_cache_max_entries
+            self.logger = logging.getLogger(__name__)
+            self._entries: OrderedDict = OrderedDict()
+            self._lock = Lock()
+            self.metrics = {
+                "hits": 0,
+                "misses": 0,
+                "expired": 0,
+                "evictions": 0,
+                "invalidations": 0
+            }
+            self._initialized = True
+
+    def key_for(self, request_data: dict) -> tuple:
+        """Clave de cache a partir de los datos de un SearchRequest"""
+        return (
+            request_data.get("booking_type"),
+            request_data.get("date"),
+            request_data.get("building"),
+            request_data.get("start_time") or "09:00",
+            request_data.get("end_time") or "18:00",
+            request_data.get("date_to"),
+            tuple(request_data.get("buildings") or ())
+        )
+
+    def _matches(self, key: tuple, date: str, building: Optional[str]) -> bool:
+        """Si la entrada incluye la fecha (y el edificio) indicados, también en búsquedas por rango"""
+        if building is not None and key[2] != building and building not in key[6]:
+            return False
+        if key[1] == date:
+            return True
+        if not key[5]:
+            return False
+        try:
+            day = datetime.strptime(date, "%d/%m/%Y")
+            return datetime.strptime(key[1], "%d/%m/%Y") <= day <= datetime.strptime(key[5], "%d/%m/%Y")
+        except (TypeError, ValueError):
+            return False
+
+    def get(self, request_data: dict) -> Optional[Tuple[list, datetime]]:
+        """
+        Retorna (resultado, momento del scrape) si hay una entrada vigente
+        """
+        if self.ttl <= 0:
+            return None
+        key = self.key_for(request_data)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.metrics["misses"] += 1
+                return None
+            stored_at, fetched_at, result = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.metrics["expired"] += 1
+                self.metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.metrics["hits"] += 1
+        return copy.deepcopy(result), fetched_at
+
+    def put(self, request_data: dict, result: list, fetched_at: Optional[datetime] = None) -> datetime:
+        """Guarda un resultado y retorna su marca de frescura"""
+        fetched_at = fetched_at or datetime.utcnow()
+        if self.ttl <= 0:
+            return fetched_at
+        key = self.key_for(request_data)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), fetched_at, copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.metrics["evictions"] += 1
+        return fetched_at
+
+    def invalidate(self, date: str, building: Optional[str] = None) -> int:
+        """
+        Elimina las entradas de una fecha (y edificio, si se indica)
+
+        Returns:
+            Cantidad de entradas eliminadas
+        """
+        with self._lock:
+            keys = [key for key in self._entries if self._matches(key, date, building)]
+            for key in keys:
+                del self._entries[key]
+            self.metrics["invalidations"] += len(keys)
+        if keys:
+            self.logger.info(f"Cache de disponibilidad invalidada para {date}: {len(keys)} entradas")
+        return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.metrics["hits"] + self.metrics["misses"]
+            return {
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl,
+                "max_entries": self.max_entries,
+                "hit_ratio": self.metrics["hits"] / lookups if lookups else 0.0,
+                **self.metrics
+            }
@@ -1,19 +1,51 @@
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException
 from selenium.webdriver.support.ui import Select
 from typing import List, Dict, Optional
 from models.schemas import SearchRequest, AvailableSlot
-from datetime import datetime
+from services.driver_pool import DriverPool
+from services.page_waits import PageWaiter
+from services.http_search_engine import HttpSearchEngine
+from services.snapshot_store import SnapshotStore
+from services.availability_cache import AvailabilityCache
+from services.metrics import span, current_timings, bind_timings, TaskTimings
+from services.search_progress import current_progress, bind_progress, report_progress
+from services.driver_factory import timed_get
+from services.timing_model import adaptive_wait, retry_delay, current_deadline, bind_deadline
+from services.xhr_capture import XhrCapture, CaptureStats
+from services.session_store import SessionStore
+from services.listing_urls import LISTING_IDS_SCRIPT, base_type_for, is_listing_url, listing_params, listing_url, site_id_for
+from services.interval_engine import blocks_to_mask, longest_run, rank_masks, slot_time, SLOT_MINUTES
+from config.settings import Settings
+from concurrent.futures import ThreadPoolExecutor, wait
+from queue import Queue, Empty
+from datetime import datetime, timedelta
 import logging
+import json
 import time
 from dataclasses import dataclass
-from typing import List
-from urllib.parse import urlparse
+from typing import List, Tuple
 import asyncio
 
+# Id de la sede e ids de sus pisos por nombre
+ListingIds = Tuple[Optional[str], Dict[str, str]]
+
+# Extrae en un solo round trip todos los espacios de la página con sus bloques libres
+SPACES_EXTRACTION_SCRIPT = """
+return JSON.stringify(Array.from(document.getElementsByClassName('scheduler-space')).map(function (space) {
+    var title = space.getElementsByTagName('h5')[0];
+    return {
+        id: space.getAttribute('data-space-id'),
+        name: title ? title.innerText : null,
+        blocks: Array.from(space.getElementsByClassName('block-free')).map(function (block) {
+            return [block.getAttribute('data-time-start'), block.getAttribute('data-time-end')];
+        })
+    };
+}));
+"""
+
 @dataclass
 class SpaceAvailability:
     space_id: str
@@ -24,6 +56,7 @@ class SpaceAvailability:
     start_time: str
     end_time: str
     page: int
+    free_mask: int = 0  # Bit i: bloque de 30 minutos i del día libre
     
     def __lt__(self, other):
         if not isinstance(other, SpaceAvailability):
@@ -31,91 +64,235 @@ class SpaceAvailability:
         return self.available_minutes < other.available_minutes
 
 class AvailabilityService:
+    # Id de sede por (baseType, edificio), compartido entre instancias: con la sesión
+    # reutilizada las búsquedas siguientes cargan el listado filtrado directamente
+    _site_ids: Dict[tuple, str] = {}
 
     def search_available_slots_sync(self, request_data: dict):
         """Versión sincrónica del método de búsqueda"""
         request = SearchRequest(**request_data)
+        if request.date_to or request.buildings:
+            return self._search_range_sync(request)
         
-        driver = None
-        try:
-            driver = self._setup_driver()
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(self._perform_search(driver, request, max_pages=2))
-            
-            if not result:
-                return []
+        if self.snapshots.all_floors_fresh(request):
+            # Todos los pisos tienen snapshot vigente: responder desde la base
+            result = self._spaces_from_snapshot(request)
+        elif self._engine_for(request) == "http":
+            result = self._perform_http_search(request, max_pages=2)
+        else:
+            with self.pool.driver() as driver:
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                result = loop.run_until_complete(self._perform_search(driver, request, max_pages=2))
+        
+        if not result:
+            return []
 
-            start_time = datetime.strptime(request.start_time, "%H:%M")
-            end_time = datetime.strptime(request.end_time, "%H:%M")
-            requested_duration = (end_time - start_time).seconds / 60
-            
-            scored_spaces = []
-            for space in result:
-                score = self._calculate_availability_score(space, requested_duration)
-                scored_spaces.append((score, space))
-            
-            scored_spaces.sort(reverse=True, key=lambda x: x[0])
-            
-            available_spaces = []
-            for score, space in scored_spaces[:10]:
-                available_slots = [{
-                    "start_time": space.start_time,
-                    "end_time": space.end_time,
-                    "duration": space.available_minutes
-                }]
-                
-                space_info = {
-                    "space_id": space.space_id,
-                    "space_name": space.space_name,
-                    "floor": space.floor,
-                    "score": score,
-                    "available_slots": available_slots,
-                    "availability": {
-                        "start_time": space.start_time,
-                        "end_time": space.end_time,
-                        "continuous_slot": space.continuous_slot,
-                        "available_minutes": space.available_minutes
-                    }
-                }
-                available_spaces.append(space_info)
+        with span("availability", "scoring"):
+            return self._rank_spaces(result, request)
             
-            return available_spaces
-                
-        finally:
-            if driver:
-                driver.quit()
-                
     def __init__(self):
         self.base_url = "https://tecoxp.skedway.com/booking.php"
         self.logger = logging.getLogger(__name__)
+        self.pool = DriverPool()
+        self.settings = Settings()
+        self.snapshots = SnapshotStore()
+        self.sessions = SessionStore()
+        self.floor_concurrency = max(1, self.settings.floor_scan_concurrency)
+
+    def expand_request(self, request: SearchRequest) -> List[SearchRequest]:
+        """Una búsqueda simple por cada combinación de fecha y edificio del rango"""
+        first_day = datetime.strptime(request.date, "%d/%m/%Y")
+        last_day = datetime.strptime(request.date_to, "%d/%m/%Y") if request.date_to else first_day
+        days = (last_day - first_day).days + 1
+        if days < 1:
+            raise ValueError("date_to es anterior a date")
+        if days > self.settings.search_range_max_days:
+            raise ValueError(f"El rango supera el máximo de {self.settings.search_range_max_days} días")
+        buildings = request.buildings or [request.building]
+        if days * len(buildings) > self.settings.search_range_max_combinations:
+            raise ValueError(
+                f"La búsqueda supera el máximo de {self.settings.search_range_max_combinations} combinaciones"
+            )
+        return [
+            request.copy(update={
+                "date": (first_day + timedelta(days=offset)).strftime("%d/%m/%Y"),
+                "building": building,
+                "date_to": None,
+                "buildings": None
+            })
+            for offset in range(days)
+            for building in buildings
+        ]
+
+    def _search_range_sync(self, request: SearchRequest) -> Dict:
+        """
+        Busca en varias fechas y edificios en una sola tarea
+
+        Cada combinación se responde desde el cache o el snapshot si es posible; el
+        resto se recorre con un único navegador, preparando la página una sola vez
+        y cambiando solo los filtros entre iteraciones.
+
+        Returns:
+            {"dates", "buildings", "by_date": {fecha: top 10}, "ranking": top 10
+            combinado, "errors": {"fecha|edificio": error}}
+        """
+        combinations = self.expand_request(request)
+        cache = AvailabilityCache()
+        results: Dict[tuple, List[Dict]] = {}
+        errors: Dict[str, str] = {}
+        to_scan = []
+        for sub in combinations:
+            cached = cache.get(sub.dict())
+            if cached:
+                results[(sub.date, sub.building)] = cached[0]
+            elif self.snapshots.all_floors_fresh(sub):
+                results[(sub.date, sub.building)] = self._finish_range_item(sub, self._spaces_from_snapshot(sub))
+            else:
+                to_scan.append(sub)
         
-    def _setup_driver(self) -> webdriver.Chrome:
-        """Configura y retorna el driver de Chrome"""
-        options = webdriver.ChromeOptions()
-        #options.add_argument('--headless')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--log-level=3')
-        options.add_argument('--silent')
-        options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        return webdriver.Chrome(options=options)
-
-    def _calculate_availability_score(self, space: SpaceAvailability, request_duration: int) -> float:
-        """
-        Calcula un score de disponibilidad basado en los criterios solicitados
-        """
-        score = 0.0
+        if to_scan:
+            if self._engine_for(request) == "http":
+                for sub in to_scan:
+                    try:
+                        spaces = self._perform_http_search(sub, max_pages=2)
+                        results[(sub.date, sub.building)] = self._finish_range_item(sub, spaces)
+                    except Exception as e:
+                        errors[f"{sub.date}|{sub.building}"] = str(e)
+            else:
+                with self.pool.driver() as driver:
+                    loop = asyncio.new_event_loop()
+                    asyncio.set_event_loop(loop)
+                    loop.run_until_complete(self._scan_range(driver, to_scan, results, errors))
         
-        if space.continuous_slot:
-            score += 20
-            
-        if space.available_minutes >= request_duration:
-            score += 100
-        else:
-            score += (space.available_minutes / request_duration) * 40
-            
-        return score
+        by_date: Dict[str, List[Dict]] = {}
+        for sub in combinations:
+            for space in results.get((sub.date, sub.building), []):
+                by_date.setdefault(sub.date, []).append({**space, "date": sub.date, "building": sub.building})
+        
+        def rank_key(space):
+            return (-space["score"], -space.get("coverage", 0))
+        
+        combined = sorted((space for spaces in by_date.values() for space in spaces), key=rank_key)
+        if errors:
+            # Con combinaciones fallidas o parciales el rango no se guarda en cache
+            report_progress("partial", {"errors": errors})
+        return {
+            "dates": list(dict.fromkeys(sub.date for sub in combinations)),
+            "buildings": list(dict.fromkeys(sub.building for sub in combinations)),
+            "by_date": {date: sorted(spaces, key=rank_key)[:10] for date, spaces in by_date.items()},
+            "ranking": combined[:10],
+            "errors": errors
+        }
+
+    async def _scan_range(self, driver: webdriver.Chrome, requests: List[SearchRequest],
+                          results: Dict[tuple, List[Dict]], errors: Dict[str, str]):
+        """Recorre varias combinaciones de fecha y edificio con la misma sesión de navegador"""
+        with span("availability", "ensure_correct_page"):
+            await self._ensure_correct_page(driver, requests[0])
+        with span("availability", "welcome_popup"):
+            await self._handle_welcome_popup(driver)
+        
+        for sub in requests:
+            self.logger.info(f"Buscando {sub.date} en {sub.building}")
+            failures: Dict[str, str] = {}
+            try:
+                spaces = await self._perform_search(driver, sub, max_pages=2, prepared=True, failures=failures)
+                results[(sub.date, sub.building)] = self._finish_range_item(sub, spaces, cache=not failures)
+                if failures:
+                    errors[f"{sub.date}|{sub.building}"] = f"Resultado parcial, pisos con error: {failures}"
+            except Exception as e:
+                self.logger.warning(f"Error buscando {sub.date} en {sub.building}: {str(e)}")
+                errors[f"{sub.date}|{sub.building}"] = str(e)
+
+    def _finish_range_item(self, request: SearchRequest, spaces: List[SpaceAvailability],
+                           cache: bool = True) -> List[Dict]:
+        """Rankea una combinación del rango y, si está completa, la guarda en cache como búsqueda simple"""
+        with span("availability", "scoring"):
+            ranked = self._rank_spaces(spaces, request) if spaces else []
+        if cache:
+            AvailabilityCache().put(request.dict(), ranked)
+        return ranked
+
+    def _engine_for(self, request: SearchRequest) -> str:
+        """Motor de búsqueda a usar: el del request o el configurado"""
+        engine = request.engine or self.settings.search_engine
+        if engine not in ("selenium", "http"):
+            raise ValueError(f"Motor de búsqueda desconocido: {engine}")
+        return engine
+
+    def _perform_http_search(self, request: SearchRequest, max_pages: int) -> List[SpaceAvailability]:
+        """
+        Realiza la búsqueda sin navegador descargando el listado por HTTP
+        """
+        all_spaces = []
+        with span("availability", "http_fetch"):
+            listing = HttpSearchEngine().fetch_listing(request, max_pages)
+        with span("availability", "parse_page"):
+            for floor, page, raw_spaces in listing:
+                spaces = self._spaces_from_raw(raw_spaces, floor, page)
+                self._report_batch(request, floor, page, spaces, "http")
+                all_spaces.extend(spaces)
+        return all_spaces
+
+    def _rank_spaces(self, spaces: List[SpaceAvailability], request: SearchRequest, limit: int = 10) -> List[Dict]:
+        """
+        Rankea todos los espacios en una sola pasada sobre sus máscaras de bloques
+        libres y arma la respuesta de los mejores
+
+        El score se calcula dentro de la franja pedida; los empates se resuelven
+        por cobertura de la franja.
+        """
+        ranking = rank_masks([space.free_mask for space in spaces], request.start_time, request.end_time, top=limit)
+
+        available_spaces = []
+        for index in ranking.order[:limit]:
+            space = spaces[index]
+            available_slots = [{
+                "start_time": space.start_time,
+                "end_time": space.end_time,
+                "duration": space.available_minutes
+            }]
+            
+            space_info = {
+                "space_id": space.space_id,
+                "space_name": space.space_name,
+                "floor": space.floor,
+                "score": ranking.scores[index],
+                "coverage": round(ranking.coverage[index], 3),
+                "available_slots": available_slots,
+                "candidate_windows": [
+                    {
+                        "start_time": slot_time(start),
+                        "end_time": slot_time(start + length),
+                        "duration": length * SLOT_MINUTES
+                    }
+                    for start, length in ranking.candidates[index]
+                ],
+                "availability": {
+                    "start_time": space.start_time,
+                    "end_time": space.end_time,
+                    "continuous_slot": space.continuous_slot,
+                    "available_minutes": space.available_minutes
+                }
+            }
+            available_spaces.append(space_info)
+        
+        return available_spaces
+
+    def _report_batch(self, request: SearchRequest, floor: str, page: int,
+                      spaces: List[SpaceAvailability], source: str):
+        """Publica los espacios rankeados de una página apenas se obtienen"""
+        if not spaces or current_progress() is None:
+            return
+        report_progress("batch", {
+            "date": request.date,
+            "building": request.building,
+            "floor": floor,
+            "page": page,
+            "source": source,
+            "spaces": self._rank_spaces(spaces, request, limit=len(spaces))
+        })
 
     async def search_available_slots(self, request: SearchRequest, max_pages: int = 5) -> List[Dict]:
         """
@@ -125,62 +302,30 @@ class AvailabilityService:
             request: Objeto SearchRequest con los criterios de búsqueda
             max_pages: Número máximo de páginas a buscar (default: 2)
         """
-        driver = None
         try:
-            driver = self._setup_driver()
-            all_spaces = await self._perform_search(driver, request, max_pages)
+            if self._engine_for(request) == "http":
+                all_spaces = self._perform_http_search(request, max_pages)
+            else:
+                with self.pool.driver() as driver:
+                    all_spaces = await self._perform_search(driver, request, max_pages)
             
             if not all_spaces:
                 return []
             
-            start_time = datetime.strptime(request.start_time, "%H:%M")
-            end_time = datetime.strptime(request.end_time, "%H:%M")
-            requested_duration = (end_time - start_time).seconds / 60
-            
-            # Ordenar espacios por score
-            scored_spaces = []
-            for space in all_spaces:
-                score = self._calculate_availability_score(space, requested_duration)
-                scored_spaces.append((score, space))
-            
-            scored_spaces.sort(reverse=True, key=lambda x: x[0])  # Ordenar por score
-            
-            
-            available_spaces = []
-            for score, space in scored_spaces[:10]:  # Top 10 mejores opciones
-                available_slots = [{
-                    "start_time": space.start_time,
-                    "end_time": space.end_time,
-                    "duration": space.available_minutes
-                }]
-                
-                space_info = {
-                    "space_id": space.space_id, 
-                    "space_name": space.space_name,
-                    "floor": space.floor,
-                    "score": score,
-                    "available_slots": available_slots,
-                    "availability": {
-                        "start_time": space.start_time,
-                        "end_time": space.end_time,
-                        "continuous_slot": space.continuous_slot,
-                        "available_minutes": space.available_minutes
-                    }
-                }
-                available_spaces.append(space_info)
-            
-            return available_spaces
+            # Top 10 mejores opciones
+            with span("availability", "scoring"):
+                return self._rank_spaces(all_spaces, request)
                 
         except Exception as e:
             self.logger.error(f"Error en búsqueda de disponibilidad: {str(e)}")
             raise Exception(f"Error en búsqueda de disponibilidad: {str(e)}")
-        finally:
-            if driver:
-                driver.quit()
 
     async def _ensure_correct_page(self, driver: webdriver.Chrome, request: SearchRequest):
         """
         Asegura que estamos en la página correcta antes de comenzar la búsqueda
+
+        Los reintentos esperan con backoff exponencial y jitter, y se cortan cuando
+        el presupuesto de la tarea no alcanza para otro intento.
         """
         max_attempts = 3
         base_type = "4" if request.booking_type == "parking" else "1"
@@ -188,72 +333,79 @@ class AvailabilityService:
         
         for attempt in range(max_attempts):
             try:
-                current_url = driver.current_url
-                parsed_current = urlparse(current_url)
-                parsed_expected = urlparse(expected_url)
-                
-                if "baseType" not in current_url or f"baseType={base_type}" not in current_url:
+                if not is_listing_url(driver.current_url, self.base_url, base_type):
                     self.logger.info(f"Redirigiendo a la página correcta. Intento {attempt + 1}")
-                    driver.get(expected_url)
+                    timed_get(driver, expected_url, "booking")
+                    if not self.sessions.ensure_valid(driver, expected_url):
+                        raise Exception("La sesión de Skedway expiró y no se pudo renovar")
                     
-                    WebDriverWait(driver, 15).until(
-                        lambda d: "baseType" in d.current_url and 
-                                f"baseType={base_type}" in d.current_url
+                    adaptive_wait(driver, "booking_url", 15).until(
+                        lambda d: is_listing_url(d.current_url, self.base_url, base_type)
                     )
                     
-                    WebDriverWait(driver, 15).until(
+                    adaptive_wait(driver, "day_input", 15).until(
                         EC.presence_of_element_located((By.ID, "day"))
                     )
                     
-                    WebDriverWait(driver, 15).until(
+                    adaptive_wait(driver, "list_view_link", 15).until(
                         EC.presence_of_element_located((By.CSS_SELECTOR, 'a[data-opt="list"]'))
                     )
                     
-                    time.sleep(5)
+                    PageWaiter(driver).loading_finished(5)
                     break
                 else:
                     self.logger.info("Ya estamos en la página correcta")
                     break
                     
             except TimeoutException:
-                if attempt == max_attempts - 1:
+                delay = retry_delay(attempt)
+                if attempt == max_attempts - 1 or delay is None:
                     raise Exception("No se pudo cargar la página correcta después de múltiples intentos")
-                time.sleep(5)
+                time.sleep(delay)
                 continue
 
     async def _handle_welcome_popup(self, driver: webdriver.Chrome):
         """
         Maneja el popup de bienvenida si está presente
+
+        Una vez cerrado con buttonTourEnd se recuerda en SessionStore, y las tareas
+        siguientes solo lo buscan en la página actual, sin esperarlo. Que no haya
+        aparecido a tiempo no alcanza: puede estar tardando en renderizarse.
         """
-        try:
-            close_button = WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.ID, "buttonTourEnd"))
-            )
-            
+        if self.sessions.tour_dismissed:
+            buttons = driver.find_elements(By.ID, "buttonTourEnd")
+            if not buttons:
+                return
+            close_button = buttons[0]
+        else:
             try:
-                close_button.click()
-                self.logger.info("Popup de bienvenida cerrado exitosamente")
-                time.sleep(2)
-            except Exception as e:
-                self.logger.warning(f"Error al cerrar popup de bienvenida: {str(e)}")
-                
-        except TimeoutException:
-            self.logger.info("No se encontró popup de bienvenida")
-            pass
+                close_button = adaptive_wait(driver, "welcome_popup", 5, optional=True).until(
+                    EC.presence_of_element_located((By.ID, "buttonTourEnd"))
+                )
+            except TimeoutException:
+                self.logger.info("No se encontró popup de bienvenida")
+                return
+        
+        try:
+            close_button.click()
+            self.logger.info("Popup de bienvenida cerrado exitosamente")
+            PageWaiter(driver).element_gone("welcome_popup_closed", (By.ID, "buttonTourEnd"), 2)
+            self.sessions.mark_tour_dismissed()
+        except Exception as e:
+            self.logger.warning(f"Error al cerrar popup de bienvenida: {str(e)}")
 
     async def _switch_to_list_view(self, driver: webdriver.Chrome):
         """
         Cambia a vista de lista
         """
         try:
-            list_view = WebDriverWait(driver, 15).until(
+            list_view = adaptive_wait(driver, "list_view_link", 15).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, 'a[data-opt="list"]'))
             )
             
             driver.execute_script("arguments[0].scrollIntoView(true);", list_view)
-            time.sleep(1)
             
-            list_view = WebDriverWait(driver, 15).until(
+            list_view = adaptive_wait(driver, "list_view_clickable", 15).until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, 'a[data-opt="list"]'))
             )
             
@@ -262,7 +414,7 @@ class AvailabilityService:
             except ElementClickInterceptedException:
                 driver.execute_script("arguments[0].click();", list_view)
             
-            WebDriverWait(driver, 10).until(
+            adaptive_wait(driver, "spaces_present", 10).until(
                 EC.presence_of_element_located((By.CLASS_NAME, "scheduler-space"))
             )
             
@@ -275,11 +427,11 @@ class AvailabilityService:
         Aplica los filtros de búsqueda
         """
         try:
-            WebDriverWait(driver, 15).until(
+            adaptive_wait(driver, "document_complete", 15).until(
                 lambda d: d.execute_script("return document.readyState") == "complete"
             )
             
-            date_input = WebDriverWait(driver, 10).until(
+            date_input = adaptive_wait(driver, "day_input", 10).until(
                 EC.presence_of_element_located((By.ID, "day"))
             )
             driver.execute_script(f"arguments[0].value = '{request.date}'", date_input)
@@ -289,9 +441,7 @@ class AvailabilityService:
             driver.execute_script(f"arguments[0].value = '{request.start_time}'", start_time)
             driver.execute_script(f"arguments[0].value = '{request.end_time}'", end_time)
             
-            time.sleep(2)
-            
-            building_select = WebDriverWait(driver, 10).until(
+            building_select = adaptive_wait(driver, "site_select", 10).until(
                 EC.presence_of_element_located((By.ID, "companySiteId"))
             )
             select = Select(building_select)
@@ -300,15 +450,18 @@ class AvailabilityService:
                     select.select_by_value(option.get_attribute("value"))
                     break
             
-            time.sleep(3)
+            # El cambio de edificio puede recargar los selectores dependientes
+            waiter = PageWaiter(driver)
+            waiter.loading_finished(3)
             
+            previous = waiter.first_space()
             filter_button = driver.find_element(By.ID, "buttonFilter")
             driver.execute_script("arguments[0].click();", filter_button)
             
-            time.sleep(7)
+            waiter.spaces_rerendered(previous, 7)
             
             try:
-                WebDriverWait(driver, 10).until_not(
+                adaptive_wait(driver, "loading_indicator_gone", 10).until_not(
                     EC.presence_of_element_located((By.CLASS_NAME, "loading-indicator"))
                 )
             except TimeoutException:
@@ -325,145 +478,471 @@ class AvailabilityService:
         Espera a que se actualice la lista de espacios
         """
         try:
-            WebDriverWait(driver, 10).until(
+            adaptive_wait(driver, "spaces_present", 10).until(
                 EC.presence_of_element_located((By.CLASS_NAME, "scheduler-space"))
             )
         except TimeoutException:
             raise Exception("Timeout esperando actualización de espacios")
 
-    async def _perform_search(self, driver: webdriver.Chrome, request: SearchRequest, max_pages: int) -> List[SpaceAvailability]:
+    async def _perform_search(self, driver: webdriver.Chrome, request: SearchRequest, max_pages: int,
+                              prepared: bool = False,
+                              failures: Optional[Dict[str, str]] = None) -> List[SpaceAvailability]:
         """
         Realiza la búsqueda completa en todos los pisos y páginas
+
+        Args:
+            prepared: El driver ya está en el listado con el popup cerrado (búsquedas
+                por rango); solo se cambian los filtros
+            failures: Si se indica, recibe los pisos que fallaron y su error; el
+                resultado es parcial cuando no queda vacío
         """
-        await self._ensure_correct_page(driver, request)
-        await self._handle_welcome_popup(driver)
+        landed = False
+        if not prepared:
+            landed = await self._open_known_listing(driver, request)
+            if not landed:
+                with span("availability", "ensure_correct_page"):
+                    await self._ensure_correct_page(driver, request)
+            with span("availability", "welcome_popup"):
+                await self._handle_welcome_popup(driver)
         
-        all_spaces = []
+        if self.settings.search_navigation == "url" and not landed:
+            # Las opciones de piso dependen de la sede: cargar el listado ya filtrado por sede
+            ids = json.loads(driver.execute_script(LISTING_IDS_SCRIPT))
+            site_id = site_id_for(ids["sites"], request.building)
+            if site_id is not None:
+                self._site_ids[(base_type_for(request.booking_type), request.building)] = site_id
+            with span("availability", "load_page"):
+                await self._load_listing_page(driver, listing_url(self.base_url, listing_params(request, site_id)))
         
         floor_select = Select(driver.find_element(By.ID, "floorId"))
         floors = [option.text for option in floor_select.options]
+        # Ids leídos una vez del listado filtrado; los navegadores auxiliares no lo cargan
+        listing = self._listing_ids(driver, request) if self.settings.search_navigation == "url" else None
+        
+        # Los pisos con snapshot vigente se leen de la base; solo se scrapean los vencidos
+        self.snapshots.register_floors(request, floors)
+        fresh = self.snapshots.fresh_floors(request)
+        stale = [floor for floor in floors if floor not in fresh]
+        all_spaces = self._spaces_from_snapshot(request, [floor for floor in floors if floor in fresh])
+        if fresh:
+            self.logger.info(f"Pisos desde snapshot: {len(fresh)}, a refrescar: {len(stale)}")
         
+        all_spaces.extend(await self._scan_floors(driver, request, stale, max_pages, listing, failures))
+        return all_spaces
+
+    def _listing_ids(self, driver: webdriver.Chrome, request: SearchRequest) -> ListingIds:
+        """Id de la sede pedida e ids de sus pisos por nombre, del listado actual"""
+        ids = json.loads(driver.execute_script(LISTING_IDS_SCRIPT))
+        return site_id_for(ids["sites"], request.building), {text: value for value, text in ids["floors"]}
+
+    async def _open_known_listing(self, driver: webdriver.Chrome, request: SearchRequest) -> bool:
+        """
+        Carga directamente el listado filtrado por sede si su id ya se conoce, sin
+        pasar por la página inicial; la sesión se valida sobre esa misma carga
+
+        Returns:
+            True si el driver quedó en el listado filtrado
+        """
+        if self.settings.search_navigation != "url":
+            return False
+        site_id = self._site_ids.get((base_type_for(request.booking_type), request.building))
+        if site_id is None:
+            return False
+        url = listing_url(self.base_url, listing_params(request, site_id))
+        with span("availability", "load_page"):
+            await self._load_listing_page(driver, url)
+        if not self.sessions.ensure_valid(driver, url):
+            raise Exception("La sesión de Skedway expiró y no se pudo renovar")
+        return True
+
+    def _spaces_from_snapshot(self, request: SearchRequest, floors: Optional[List[str]] = None) -> List[SpaceAvailability]:
+        """
+        Reconstruye la disponibilidad de los pisos indicados desde el snapshot persistido
+        """
+        if floors is not None and not floors:
+            return []
+        all_spaces = []
+        with span("availability", "snapshot_read"):
+            for floor, page, raw_spaces in self.snapshots.load_spaces(request, floors):
+                spaces = self._spaces_from_raw(raw_spaces, floor, page)
+                self._report_batch(request, floor, page, spaces, "snapshot")
+                all_spaces.extend(spaces)
+        return all_spaces
+
+    async def _scan_floors(self, driver: webdriver.Chrome, request: SearchRequest,
+                           floors: List[str], max_pages: int,
+                           listing: Optional[ListingIds] = None,
+                           failures: Optional[Dict[str, str]] = None) -> List[SpaceAvailability]:
+        """
+        Recorre los pisos, en paralelo si floor_concurrency lo permite.
+
+        El driver actual y hasta floor_concurrency - 1 navegadores extra toman pisos
+        de una cola compartida. Si el pool no tiene navegadores libres, el driver
+        actual recorre los pisos restantes. Un piso que falla se registra en failures
+        y se omite, también cuando el recorrido es secuencial; el resultado parcial se
+        publica como evento "partial" para que no se guarde en cache.
+
+        Raises:
+            TimeoutError: Si se agotó el presupuesto de la tarea
+            Exception: Si fallaron todos los pisos
+        """
+        pending = Queue()
+        for floor in floors:
+            pending.put(floor)
+        results: Dict[str, List[SpaceAvailability]] = {}
+        failures = {} if failures is None else failures
+        
+        helpers = min(self.floor_concurrency, len(floors)) - 1
+        if helpers > 0:
+            timings = current_timings()
+            progress = current_progress()
+            deadline = current_deadline()
+            executor = ThreadPoolExecutor(max_workers=helpers, thread_name_prefix="floor-scan")
+            try:
+                futures = [
+                    executor.submit(self._run_floor_helper, request, pending, results, failures, max_pages,
+                                    listing, timings, progress, deadline)
+                    for _ in range(helpers)
+                ]
+                await self._drain_floors(driver, request, pending, results, failures, max_pages, listing)
+                wait(futures)
+            finally:
+                executor.shutdown(wait=False)
+        else:
+            await self._drain_floors(driver, request, pending, results, failures, max_pages, listing)
+        
+        if failures:
+            self.logger.warning(f"Pisos con error ({len(failures)}/{len(floors)}): {failures}")
+            if len(failures) == len(floors):
+                raise Exception(f"No se pudo buscar en ningún piso: {failures}")
+            report_progress("partial", {
+                "date": request.date,
+                "building": request.building,
+                "failed_floors": dict(failures)
+            })
+        
+        all_spaces = []
         for floor in floors:
-            self.logger.info(f"Buscando en piso: {floor}")
+            all_spaces.extend(results.get(floor, []))
+        return all_spaces
+
+    def _run_floor_helper(self, request: SearchRequest, pending: Queue,
+                          results: Dict[str, List[SpaceAvailability]], failures: Dict[str, str],
+                          max_pages: int, listing: Optional[ListingIds] = None,
+                          timings: Optional[TaskTimings] = None, progress=None, deadline=None):
+        """Thread auxiliar: toma un navegador del pool sin esperar y recorre pisos pendientes"""
+        if pending.empty():
+            return
+        with bind_timings(timings), bind_progress(progress), bind_deadline(deadline):
+            self._scan_helper_floors(request, pending, results, failures, max_pages, listing)
+
+    def _scan_helper_floors(self, request: SearchRequest, pending: Queue,
+                            results: Dict[str, List[SpaceAvailability]], failures: Dict[str, str],
+                            max_pages: int, listing: Optional[ListingIds] = None):
+        """Recorre pisos pendientes con un navegador adicional del pool"""
+        try:
+            pooled = self.pool.acquire(timeout=0)
+        except TimeoutError:
+            return
+        if pending.empty():
+            # El driver principal terminó mientras se obtenía el navegador
+            self.pool.release(pooled)
+            return
+        
+        loop = asyncio.new_event_loop()
+        failed = False
+        try:
+            with span("availability", "ensure_correct_page"):
+                loop.run_until_complete(self._ensure_correct_page(pooled.driver, request))
+            with span("availability", "welcome_popup"):
+                loop.run_until_complete(self._handle_welcome_popup(pooled.driver))
+            loop.run_until_complete(
+                self._drain_floors(pooled.driver, request, pending, results, failures, max_pages, listing)
+            )
+        except Exception as e:
+            failed = True
+            self.logger.warning(f"Navegador auxiliar de búsqueda descartado: {str(e)}")
+        finally:
+            loop.close()
+            self.pool.release(pooled, failed)
+
+    async def _drain_floors(self, driver: webdriver.Chrome, request: SearchRequest, pending: Queue,
+                            results: Dict[str, List[SpaceAvailability]], failures: Dict[str, str],
+                            max_pages: int, listing: Optional[ListingIds] = None):
+        """
+        Recorre pisos de la cola compartida hasta vaciarla, aislando los errores por piso
+
+        Un presupuesto agotado no es un error del piso: corta el recorrido.
+        """
+        while True:
+            try:
+                floor = pending.get_nowait()
+            except Empty:
+                return
+            try:
+                results[floor] = await self._scan_floor(driver, request, floor, max_pages, listing)
+            except TimeoutError as e:
+                # Registrado igual: si el que corta es un navegador auxiliar, el piso no se pierde en silencio
+                failures[floor] = str(e)
+                raise
+            except Exception as e:
+                self.logger.warning(f"Error buscando en piso {floor}: {str(e)}")
+                failures[floor] = str(e)
+
+    async def _scan_floor(self, driver: webdriver.Chrome, request: SearchRequest, floor: str, max_pages: int,
+                          listing: Optional[ListingIds] = None) -> List[SpaceAvailability]:
+        """
+        Busca en todas las páginas de un piso
+        """
+        if self.settings.search_navigation == "url":
+            return await self._scan_floor_by_url(driver, request, floor, max_pages, listing)
+        
+        self.logger.info(f"Buscando en piso: {floor}")
+        with span("availability", "select_floor"):
             floor_select = Select(driver.find_element(By.ID, "floorId"))
             floor_select.select_by_visible_text(floor)
-            time.sleep(2)
-            
+            waiter = PageWaiter(driver)
+            waiter.loading_finished(2)
+        
+        with span("availability", "switch_to_list_view"):
             await self._switch_to_list_view(driver)
+        capture = self._capture_for(driver)
+        with span("availability", "apply_filters"):
+            if capture:
+                capture.reset()
             await self._apply_filters(driver, request)
-            
-            page = 1
-            while page <= max_pages:
-                spaces = await self._analyze_page_spaces(driver, floor, page)
-                if not spaces:
-                    break
-                    
-                all_spaces.extend(spaces)
+        
+        floor_spaces = []
+        raw_pages = []
+        page = 1
+        while page <= max_pages:
+            with span("availability", "parse_page"):
+                raw_spaces = self._page_raw_spaces(driver, capture)
+                spaces = self._spaces_from_raw(raw_spaces, floor, page)
+            if not spaces:
+                break
                 
-                if page >= max_pages:
-                    break
+            self._report_batch(request, floor, page, spaces, "scrape")
+            floor_spaces.extend(spaces)
+            raw_pages.append((page, raw_spaces))
+            
+            if page >= max_pages:
+                break
+            
+            with span("availability", "pagination"):
+                if capture:
+                    capture.reset()
+                moved = await self._go_to_next_page(driver, waiter, page)
+            if not moved:
+                break
+            page += 1
+        
+        self._save_snapshot(request, floor, raw_pages)
                 
+        return floor_spaces
+
+    async def _scan_floor_by_url(self, driver: webdriver.Chrome, request: SearchRequest, floor: str,
+                                 max_pages: int, listing: Optional[ListingIds] = None) -> List[SpaceAvailability]:
+        """
+        Busca en todas las páginas de un piso cargando cada página por URL
+
+        Los filtros y la página van en la query string, así que cada página es
+        direccionable: se carga directamente y se reintenta por separado.
+
+        Args:
+            listing: Ids de sede y pisos leídos del listado filtrado por el driver
+                principal; sin ellos se leen de la página actual del driver
+        """
+        self.logger.info(f"Buscando en piso (URL): {floor}")
+        site_id, floor_ids = listing if listing is not None else self._listing_ids(driver, request)
+        floor_id = floor_ids.get(floor)
+        if floor_id is None:
+            raise Exception(f"No se encontró el id del piso {floor}")
+        
+        capture = self._capture_for(driver)
+        floor_spaces = []
+        raw_pages = []
+        for page in range(1, max_pages + 1):
+            url = listing_url(self.base_url, listing_params(request, site_id, floor_id, page))
+            with span("availability", "load_page"):
+                if capture:
+                    capture.reset()
+                await self._load_listing_page(driver, url)
+            with span("availability", "parse_page"):
+                raw_spaces = self._page_raw_spaces(driver, capture)
+                spaces = self._spaces_from_raw(raw_spaces, floor, page)
+            if not spaces:
+                break
+            
+            self._report_batch(request, floor, page, spaces, "scrape")
+            floor_spaces.extend(spaces)
+            raw_pages.append((page, raw_spaces))
+            
+            if not driver.find_elements(By.CSS_SELECTOR, f"a.page-link[data-page='{page + 1}']"):
+                break
+        
+        self._save_snapshot(request, floor, raw_pages)
+        
+        return floor_spaces
+
+    def _save_snapshot(self, request: SearchRequest, floor: str, raw_pages: List[Tuple[int, List[Dict]]]):
+        """
+        Persiste el snapshot del piso recién scrapeado
+
+        Es un efecto secundario: si falla (p. ej. otro trabajador refrescó el mismo
+        piso con otra franja y chocó la restricción única), se registra y la
+        búsqueda sigue con los espacios ya obtenidos.
+        """
+        with span("availability", "snapshot_write"):
+            try:
+                self.snapshots.save_floor(request, floor, raw_pages)
+            except Exception as e:
+                self.logger.warning(f"No se pudo guardar el snapshot de {floor}: {str(e)}")
+
+    async def _load_listing_page(self, driver: webdriver.Chrome, url: str, attempts: int = 2):
+        """Carga una página del listado; si falla la carga, reintenta solo esa página"""
+        for attempt in range(attempts):
+            try:
+                timed_get(driver, url, "listing")
+                break
+            except TimeoutException:
+                if attempt == attempts - 1:
+                    raise Exception(f"No se pudo cargar el listado: {url}")
+                self.logger.warning(f"Reintentando carga del listado ({attempt + 1}/{attempts})")
+        
+        waiter = PageWaiter(driver)
+        waiter.loading_finished(5)
+        if driver.find_elements(By.CLASS_NAME, "scheduler-space"):
+            return
+        # La vista por defecto puede ser la grilla; la vista de lista se recuerda en la sesión
+        if driver.find_elements(By.CSS_SELECTOR, 'a[data-opt="list"]'):
+            try:
+                await self._switch_to_list_view(driver)
+            except Exception:
+                # Página sin espacios
+                pass
+
+    async def _go_to_next_page(self, driver: webdriver.Chrome, waiter: PageWaiter, page: int) -> bool:
+        """
+        Avanza a la página siguiente del listado
+
+        Returns:
+            True si se pasó a la página page + 1, False si no hay más páginas o falló
+        """
+        try:
+            pagination = adaptive_wait(driver, "pagination", 10).until(
+                EC.presence_of_element_located((By.CLASS_NAME, "pagination"))
+            )
+            
+            next_page_buttons = driver.find_elements(By.CSS_SELECTOR, f"a.page-link[data-page='{page + 1}']")
+            
+            if not next_page_buttons:
+                return False
+            
+            next_page = next_page_buttons[0]
+            
+            driver.execute_script(
+                "arguments[0].scrollIntoView({block: 'center', behavior: 'instant'});", 
+                next_page
+            )
+            
+            next_page = adaptive_wait(driver, "next_page_clickable", 10).until(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, f"a.page-link[data-page='{page + 1}']"))
+            )
+            
+            previous = waiter.first_space()
+            try:
+                next_page.click()
+            except Exception:
                 try:
-                    pagination = WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.CLASS_NAME, "pagination"))
-                    )
-                    
-                    next_page_buttons = driver.find_elements(By.CSS_SELECTOR, f"a.page-link[data-page='{page + 1}']")
-                    
-                    if not next_page_buttons:
-                        break
-                    
-                    next_page = next_page_buttons[0]
-                    
-                    driver.execute_script(
-                        "arguments[0].scrollIntoView({block: 'center', behavior: 'smooth'});", 
-                        next_page
-                    )
-                    time.sleep(1)
-                    
-                    next_page = WebDriverWait(driver, 10).until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, f"a.page-link[data-page='{page + 1}']"))
-                    )
-                    
-                    try:
-                        next_page.click()
-                    except Exception:
-                        try:
-                            driver.execute_script("arguments[0].click();", next_page)
-                        except Exception:
-                            actions = webdriver.ActionChains(driver)
-                            actions.move_to_element(next_page).click().perform()
-                    
-                    time.sleep(2)
-                    
-                    WebDriverWait(driver, 10).until(
-                        lambda d: d.find_element(By.CSS_SELECTOR, "li.page-item.active a").get_attribute("data-page") == str(page + 1)
-                    )
-                    
-                    page += 1
-                    
-                except TimeoutException:
-                    self.logger.warning(f"Timeout esperando paginación en página {page}")
-                    break
-                except Exception as e:
-                    self.logger.error(f"Error en paginación: {str(e)}")
-                    break
-                    
-        return all_spaces
+                    driver.execute_script("arguments[0].click();", next_page)
+                except Exception:
+                    actions = webdriver.ActionChains(driver)
+                    actions.move_to_element(next_page).click().perform()
+            
+            if not waiter.active_page(page + 1, 12, previous):
+                raise TimeoutException(f"La página {page + 1} no se activó")
+            
+            return True
+            
+        except TimeoutException:
+            self.logger.warning(f"Timeout esperando paginación en página {page}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Error en paginación: {str(e)}")
+            return False
 
     async def _analyze_page_spaces(self, driver: webdriver.Chrome, floor: str, page: int) -> List[SpaceAvailability]:
         """
         Analiza los espacios disponibles en la página actual
         """
+        return self._spaces_from_raw(self._extract_raw_spaces(driver), floor, page)
+
+    def _capture_for(self, driver: webdriver.Chrome) -> Optional[XhrCapture]:
+        """Captura de respuestas XHR si está habilitada"""
+        if self.settings.search_capture != "xhr":
+            return None
+        return XhrCapture(driver, self.settings.xhr_capture_url_patterns, self.settings.xhr_capture_wait)
+
+    def _page_raw_spaces(self, driver: webdriver.Chrome, capture: Optional[XhrCapture]) -> List[Dict]:
+        """
+        Espacios de la página actual: desde las respuestas XHR capturadas o, si no
+        hay una reconocible, desde el DOM
+        """
+        if capture is not None:
+            raw_spaces = capture.spaces()
+            if raw_spaces is not None:
+                CaptureStats().record("pages_captured")
+                return raw_spaces
+            CaptureStats().record("pages_fallback")
+        return self._extract_raw_spaces(driver)
+
+    def _extract_raw_spaces(self, driver: webdriver.Chrome) -> List[Dict]:
+        """Extrae los espacios de la página actual en un solo round trip"""
+        return json.loads(driver.execute_script(SPACES_EXTRACTION_SCRIPT))
+
+    def _spaces_from_raw(self, raw_spaces: List[Dict], floor: str, page: int) -> List[SpaceAvailability]:
+        """
+        Convierte los espacios extraídos de la página en SpaceAvailability
+
+        El tramo continuo de cada espacio sale de su máscara de bloques libres (ver
+        blocks_to_mask): solo bloques realmente contiguos, sin importar su orden.
+
+        Args:
+            raw_spaces: Lista de {"id", "name", "blocks": [[inicio, fin], ...]}
+                tal como la retorna SPACES_EXTRACTION_SCRIPT
+        """
         spaces = []
-        space_elements = driver.find_elements(By.CLASS_NAME, "scheduler-space")
         
-        for space_elem in space_elements:
+        for raw in raw_spaces:
             try:
-                h5_element = space_elem.find_element(By.TAG_NAME, "h5")
-                full_text = h5_element.text
-                space_name = full_text.split('|')[0].replace('favorite_border', '').strip()
+                if raw.get("name") is None:
+                    raise Exception("Espacio sin título h5")
+                space_name = raw["name"].split('|')[0].replace('favorite_border', '').strip()
                 
                 # Ignorar espacios para motos
                 if "EHOBA-MOTO" in space_name:
                     continue
                     
-                space_id = space_elem.get_attribute("data-space-id")
-                
-                time_blocks = space_elem.find_elements(By.CLASS_NAME, "block-free")
+                time_blocks = raw.get("blocks") or []
                 if not time_blocks:
                     continue
                     
-                current_block = {"start": None, "end": None, "minutes": 0}
-                longest_block = {"start": None, "end": None, "minutes": 0}
-                
-                for block in time_blocks:
-                    start_time = block.get_attribute("data-time-start")
-                    end_time = block.get_attribute("data-time-end")
+                free_mask = blocks_to_mask(time_blocks)
+                start, length = longest_run(free_mask)
+                minutes = length * SLOT_MINUTES
                     
-                    if current_block["start"] is None:
-                        current_block = {"start": start_time, "end": end_time, "minutes": 30}
-                    elif self._times_are_consecutive(current_block["end"], start_time):
-                        current_block["end"] = end_time
-                        current_block["minutes"] += 30
-                    else:
-                        if current_block["minutes"] > longest_block["minutes"]:
-                            longest_block = current_block.copy()
-                        current_block = {"start": start_time, "end": end_time, "minutes": 30}
-                
-                if current_block["minutes"] > longest_block["minutes"]:
-                    longest_block = current_block
-                    
-                if longest_block["minutes"] >= 30:
+                if minutes >= 30:
                     spaces.append(SpaceAvailability(
-                        space_id=space_id,
+                        space_id=raw.get("id"),
                         space_name=space_name, 
                         floor=floor,
-                        available_minutes=longest_block["minutes"],
-                        continuous_slot=longest_block["minutes"] >= 60,
-                        start_time=longest_block["start"],
-                        end_time=longest_block["end"],
-                        page=page
+                        available_minutes=minutes,
+                        continuous_slot=minutes >= 60,
+                        start_time=slot_time(start),
+                        end_time=slot_time(start + length),
+                        page=page,
+                        free_mask=free_mask
                     ))
                     
             except Exception as e:
@@ -472,21 +951,6 @@ class AvailabilityService:
                 
         return spaces
 
-    def _times_are_consecutive(self, time1: str, time2: str) -> bool:
-        """
-        Verifica si dos horarios son consecutivos
-        """
-        try:
-            hours1, minutes1 = map(int, time1.split(':'))
-            hours2, minutes2 = map(int, time2.split(':'))
-            
-            total_minutes1 = hours1 * 60 + minutes1
-            total_minutes2 = hours2 * 60 + minutes2
-            
-            return total_minutes2 - total_minutes1 <= 30
-        except:
-            return False
-
     def _is_valid_range(self, time_range: Dict[str, str]) -> bool:
         """
         Verifica si un rango de tiempo es válido (al menos 30 minutos)
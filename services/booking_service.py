@@ -1,11 +1,22 @@
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from models.schemas import BookingRequest, BookingResponse
+from models.schemas import BookingRequest, BookingResponse, BookingBatchRequest
+from services.driver_pool import DriverPool
+from services.page_waits import PageWaiter
+from services.driver_factory import timed_get, record_page_load, open_tab
+from services.timing_model import adaptive_wait, current_deadline, bind_deadline
+from services.availability_cache import AvailabilityCache
+from services.snapshot_store import SnapshotStore
+from services.metrics import span, current_timings, bind_timings, TaskTimings
+from config.settings import Settings
+from concurrent.futures import ThreadPoolExecutor, wait
+from queue import Queue, Empty
+from typing import Iterable, List, Optional
 from urllib.parse import quote
 from datetime import datetime
+import asyncio
 import logging
 import json
 
@@ -13,27 +24,36 @@ class BookingService:
     def __init__(self):
         self.base_url = "https://tecoxp.skedway.com/booking-form.php"
         self.logger = logging.getLogger(__name__)
+        self.pool = DriverPool()
+        settings = Settings()
+        self.batch_max_sessions = max(1, settings.booking_batch_max_sessions)
+        self.batch_max_items = settings.booking_batch_max_items
+
+    def make_reservation_sync(self, request_data: dict) -> dict:
+        """Versión sincrónica de la reserva, para ejecutarla en un trabajador de la cola"""
+        request = BookingRequest(**request_data)
+        with self.pool.driver() as driver:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                response = loop.run_until_complete(self._perform_booking(driver, request))
+            finally:
+                loop.close()
+        return response.dict()
 
     async def make_reservation(self, request: BookingRequest) -> BookingResponse:
-        """Realiza una reserva basada en los datos proporcionados"""
-        driver = None
+        """
+        Realiza una reserva basada en los datos proporcionados
+
+        Ejecuta Selenium en el loop actual: solo usar fuera del loop de la API
+        (el router encola la reserva en QueueService).
+        """
         try:
-            driver = self._setup_driver()
-            return await self._perform_booking(driver, request)
+            with self.pool.driver() as driver:
+                return await self._perform_booking(driver, request)
         except Exception as e:
             self.logger.error(f"Error en proceso de reserva: {str(e)}")
             raise
-        finally:
-            if driver:
-                driver.quit()
-
-    def _setup_driver(self) -> webdriver.Chrome:
-        """Configura y retorna el driver de Chrome"""
-        options = webdriver.ChromeOptions()
-        #options.add_argument('--headless')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        return webdriver.Chrome(options=options)
 
     async def _perform_booking(self, driver: webdriver.Chrome, request: BookingRequest) -> BookingResponse:
         """Ejecuta el proceso de reserva"""
@@ -41,18 +61,192 @@ class BookingService:
             # Construir y cargar URL de reserva
             booking_url = self._build_booking_url(request)
             self.logger.info(f"Intentando reserva con URL: {booking_url}")
-            driver.get(booking_url)
+            with span("booking", "load_form"):
+                timed_get(driver, booking_url, "booking_form")
             
-            # Esperar que cargue el formulario y completar datos
-            await self._fill_booking_form(driver, request)
+            response = await self._complete_booking(driver, request, booking_url)
             
-            # Realizar la reserva
-            return await self._submit_booking(driver, booking_url)
+            # La disponibilidad cacheada para esa fecha ya no es válida
+            self._invalidate_availability([request.date])
+            return response
             
         except Exception as e:
             self.logger.error(f"Error en proceso de reserva: {str(e)}")
             raise Exception(f"Error al realizar la reserva: {str(e)}")
 
+    async def _complete_booking(self, driver: webdriver.Chrome, request: BookingRequest,
+                                booking_url: str) -> BookingResponse:
+        """Completa y envía el formulario ya cargado en el driver"""
+        # Esperar que cargue el formulario y completar datos
+        with span("booking", "fill_form"):
+            await self._fill_booking_form(driver, request)
+        
+        # Realizar la reserva
+        with span("booking", "submit"):
+            return await self._submit_booking(driver, booking_url)
+
+    def _invalidate_availability(self, dates: Iterable[str]):
+        for date in set(dates):
+            AvailabilityCache().invalidate(date)
+            SnapshotStore().invalidate(date)
+
+    def make_reservations_batch_sync(self, request_data: dict) -> dict:
+        """
+        Realiza varias reservas reutilizando una o pocas sesiones del pool
+
+        Cada sesión toma reservas de una cola compartida. Mientras completa y envía
+        un formulario, carga el siguiente en una segunda pestaña, de modo que el
+        tiempo total se acerca al de N envíos y no al de N navegadores.
+        """
+        batch = BookingBatchRequest(**request_data)
+        if len(batch.items) > self.batch_max_items:
+            raise ValueError(f"El lote supera el máximo de {self.batch_max_items} reservas")
+        
+        pending = Queue()
+        for index, item in enumerate(batch.items):
+            pending.put((index, item))
+        results: List[Optional[dict]] = [None] * len(batch.items)
+        
+        helpers = min(batch.sessions, self.batch_max_sessions, len(batch.items)) - 1
+        try:
+            # La sesión principal sale del pool antes que las auxiliares: si no, con un
+            # pool chico las auxiliares pueden tomar todos los navegadores y dejarla esperando
+            with self.pool.driver() as driver:
+                self._run_batch_sessions(driver, helpers, pending, results)
+        except Exception as e:
+            self.logger.error(f"Sesión principal del lote interrumpida: {str(e)}")
+        
+        for index, item in enumerate(batch.items):
+            if results[index] is None:
+                results[index] = {
+                    "index": index,
+                    "space_id": item.space_id,
+                    "status": "failed",
+                    "message": "La reserva no se procesó: la sesión del navegador se interrumpió",
+                    "booking_url": None
+                }
+        
+        booked = [item.date for item, result in zip(batch.items, results) if result and result["status"] == "success"]
+        self._invalidate_availability(booked)
+        
+        succeeded = len(booked)
+        return {
+            "status": "success" if succeeded == len(results) else "partial" if succeeded else "failed",
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "items": results
+        }
+
+    def _run_batch_sessions(self, driver: webdriver.Chrome, helpers: int, pending: Queue,
+                            results: List[Optional[dict]]):
+        """Procesa el lote con el driver principal y hasta helpers navegadores libres del pool"""
+        if helpers <= 0:
+            self._run_batch_session(driver, pending, results)
+            return
+        timings = current_timings()
+        deadline = current_deadline()
+        executor = ThreadPoolExecutor(max_workers=helpers, thread_name_prefix="booking-batch")
+        try:
+            futures = [
+                executor.submit(self._run_batch_helper, pending, results, timings, deadline)
+                for _ in range(helpers)
+            ]
+            try:
+                self._run_batch_session(driver, pending, results)
+            finally:
+                # Los navegadores auxiliares pueden tener reservas ya tomadas de la cola
+                wait(futures)
+        finally:
+            executor.shutdown(wait=False)
+
+    def _run_batch_helper(self, pending: Queue, results: List[Optional[dict]],
+                          timings: Optional[TaskTimings] = None, deadline=None):
+        """Thread auxiliar: toma un navegador del pool sin esperar y procesa reservas pendientes"""
+        if pending.empty():
+            return
+        try:
+            pooled = self.pool.acquire(timeout=0)
+        except TimeoutError:
+            return
+        failed = False
+        try:
+            with bind_timings(timings), bind_deadline(deadline):
+                self._run_batch_session(pooled.driver, pending, results)
+        except Exception as e:
+            failed = True
+            self.logger.warning(f"Navegador auxiliar de reservas descartado: {str(e)}")
+        finally:
+            self.pool.release(pooled, failed)
+
+    def _run_batch_session(self, driver: webdriver.Chrome, pending: Queue, results: List[Optional[dict]]):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._drain_batch(driver, pending, results))
+        finally:
+            loop.close()
+
+    def _next_batch_item(self, pending: Queue):
+        try:
+            index, request = pending.get_nowait()
+        except Empty:
+            return None
+        return index, request, self._build_booking_url(request)
+
+    async def _drain_batch(self, driver: webdriver.Chrome, pending: Queue, results: List[Optional[dict]]):
+        """
+        Procesa reservas de la cola con dos pestañas: una con el formulario en curso
+        y otra cargando el siguiente
+        """
+        current = self._next_batch_item(pending)
+        if current is None:
+            return
+        
+        original = driver.current_window_handle
+        tabs = [original, open_tab(driver)]
+        driver.switch_to.window(original)
+        waiter = PageWaiter(driver)
+        try:
+            with span("booking", "load_form"):
+                timed_get(driver, current[2], "booking_form")
+            
+            while current is not None:
+                index, request, booking_url = current
+                following = self._next_batch_item(pending)
+                if following is not None:
+                    # Iniciar la carga del siguiente formulario en la otra pestaña
+                    driver.switch_to.window(tabs[1])
+                    waiter.start_navigation(following[2])
+                    driver.switch_to.window(tabs[0])
+                
+                try:
+                    response = await self._complete_booking(driver, request, booking_url)
+                    results[index] = {"index": index, "space_id": request.space_id, **response.dict()}
+                except Exception as e:
+                    self.logger.warning(f"Reserva {index + 1} del lote falló: {str(e)}")
+                    results[index] = {
+                        "index": index,
+                        "space_id": request.space_id,
+                        "status": "failed",
+                        "message": str(e),
+                        "booking_url": booking_url
+                    }
+                
+                if following is not None:
+                    tabs.reverse()
+                    driver.switch_to.window(tabs[0])
+                    with span("booking", "load_form"):
+                        waiter.navigated(15)
+                    record_page_load(driver, "booking_form")
+                current = following
+        finally:
+            # Dejar el navegador con una sola pestaña para el próximo uso del pool
+            for handle in tabs:
+                if handle != original:
+                    driver.switch_to.window(handle)
+                    driver.close()
+            driver.switch_to.window(original)
+
     def _build_booking_url(self, request: BookingRequest) -> str:
         """Construye la URL con los parámetros necesarios para la reserva"""
         try:
@@ -97,7 +291,7 @@ class BookingService:
     async def _fill_booking_form(self, driver: webdriver.Chrome, request: BookingRequest):
         """Completa el formulario de reserva"""
         try:
-            title_input = WebDriverWait(driver, 10).until(
+            title_input = adaptive_wait(driver, "booking_form", 10).until(
                 EC.presence_of_element_located((By.ID, "subject"))
             )
             
@@ -135,12 +329,12 @@ class BookingService:
     async def _submit_booking(self, driver: webdriver.Chrome, booking_url: str) -> BookingResponse:
         """Envía el formulario de reserva y verifica la respuesta"""
         try:
-            reserve_button = WebDriverWait(driver, 10).until(
+            reserve_button = adaptive_wait(driver, "reserve_button", 10).until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, "button.btn-submit"))
             )
             driver.execute_script("arguments[0].click();", reserve_button)
 
-            success_message = WebDriverWait(driver, 10).until(
+            success_message = adaptive_wait(driver, "booking_confirmation", 10).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "[data-notify='message']"))
             )
 
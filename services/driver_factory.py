@@ -0,0 +1,147 @@
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from typing import List, Optional
+from config.settings import Settings
+from services.metrics import MetricsRegistry
+from services.timing_model import TimingModel, wait_timeout
+import logging
+import time
+
+try:
+    import psutil
+except ImportError:  # psutil es opcional: sin él no se mide la memoria de los navegadores
+    psutil = None
+
+PAGE_LOAD_SECONDS = MetricsRegistry().histogram(
+    "reserva_page_load_seconds",
+    "Tiempo de carga de página según la Navigation Timing API del navegador",
+    ("page", "milestone")
+)
+
+# Milestones de PerformanceNavigationTiming, relativos al inicio de la navegación
+NAVIGATION_TIMING_SCRIPT = """
+var entry = performance.getEntriesByType('navigation')[0];
+if (!entry) { return null; }
+return {
+    dom_content_loaded: entry.domContentLoadedEventEnd,
+    load: entry.loadEventEnd,
+    transfer_bytes: entry.transferSize
+};
+"""
+
+class DriverFactory:
+    """
+    Crea los navegadores Chrome de la aplicación a partir de Settings.
+
+    Aplica chrome_options, corre headless salvo que se desactive, usa la
+    estrategia de carga configurada (eager: no espera imágenes ni iframes) y
+    bloquea imágenes, fuentes, media y hosts de terceros vía preferencias de
+    Chrome y Network.setBlockedURLs de DevTools.
+
+    Network.setBlockedURLs vale solo para la pestaña (target) en la que se
+    ejecuta: las pestañas nuevas se abren con open_tab, que lo vuelve a aplicar.
+    """
+
+    def __init__(self):
+        self.settings = Settings()
+        self.logger = logging.getLogger(__name__)
+
+    def options(self) -> webdriver.ChromeOptions:
+        options = webdriver.ChromeOptions()
+        arguments: List[str] = list(self.settings.chrome_options)
+        if self.settings.chrome_headless and not any(arg.startswith("--headless") for arg in arguments):
+            arguments.append("--headless=new")
+        for argument in arguments:
+            options.add_argument(argument)
+        options.add_experimental_option("excludeSwitches", ["enable-logging"])
+        options.page_load_strategy = self.settings.chrome_page_load_strategy
+        if self.settings.search_capture == "xhr":
+            # Eventos de red en los logs de performance, para XhrCapture
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        if self.settings.chrome_block_assets:
+            # 2 = bloquear; las fuentes y la media se bloquean por URL
+            options.add_experimental_option("prefs", {
+                "profile.managed_default_content_settings.images": 2,
+                "profile.default_content_setting_values.notifications": 2
+            })
+        return options
+
+    def create(self) -> webdriver.Chrome:
+        """Lanza un Chrome configurado"""
+        driver = webdriver.Chrome(options=self.options())
+        self.block_urls(driver)
+        return driver
+
+    def block_urls(self, driver: webdriver.Chrome):
+        """Aplica chrome_blocked_urls a la pestaña actual del driver"""
+        if not self.settings.chrome_block_assets or not self.settings.chrome_blocked_urls:
+            return
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(self.settings.chrome_blocked_urls)})
+        except Exception as e:
+            self.logger.warning(f"No se pudo configurar el bloqueo de recursos: {str(e)}")
+
+def open_tab(driver: webdriver.Chrome) -> str:
+    """
+    Abre una pestaña nueva con el mismo bloqueo de recursos que la original y queda en ella
+
+    Returns:
+        Handle de la pestaña nueva
+    """
+    driver.switch_to.new_window("tab")
+    DriverFactory().block_urls(driver)
+    return driver.current_window_handle
+
+def timed_get(driver: webdriver.Chrome, url: str, page: str):
+    """
+    driver.get registrando los tiempos de carga de la página en el histograma, con
+    timeout de carga aprendido por tipo de página
+    """
+    step = f"page_load.{page}"
+    timeout = wait_timeout(step, TimingModel().page_load_timeout)
+    driver.set_page_load_timeout(timeout)
+    started = time.monotonic()
+    try:
+        driver.get(url)
+    except TimeoutException:
+        TimingModel().observe(step, timeout, timed_out=True)
+        raise
+    TimingModel().observe(step, time.monotonic() - started)
+    record_page_load(driver, page)
+
+def record_page_load(driver: webdriver.Chrome, page: str) -> Optional[dict]:
+    """Registra los tiempos de la última navegación del driver"""
+    try:
+        timing = driver.execute_script(NAVIGATION_TIMING_SCRIPT)
+    except Exception:
+        return None
+    if not timing:
+        return None
+    for milestone in ("dom_content_loaded", "load"):
+        # Con carga eager, load puede no haber ocurrido todavía (0)
+        if timing.get(milestone):
+            PAGE_LOAD_SECONDS.observe(timing[milestone] / 1000, page=page, milestone=milestone)
+    return timing
+
+def driver_rss_bytes(driver: webdriver.Chrome) -> Optional[int]:
+    """
+    Memoria residente de chromedriver y todos los procesos de Chrome que lanzó
+
+    Returns:
+        Bytes, o None si psutil no está instalado o no se pudo medir
+    """
+    if psutil is None:
+        return None
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process] + process.children(recursive=True)
+    except Exception:
+        return None
+    total = 0
+    for child in processes:
+        try:
+            total += child.memory_info().rss
+        except psutil.Error:
+            continue
+    return total
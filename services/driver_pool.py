@@ -0,0 +1,260 @@
+from selenium import webdriver
+from threading import Condition, Thread
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import List, Optional
+from config.settings import Settings
+from services.metrics import span
+from services.driver_factory import DriverFactory, timed_get, driver_rss_bytes
+from services.session_store import SessionStore
+import logging
+import time
+
+@dataclass
+class PooledDriver:
+    driver: webdriver.Chrome
+    uses: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+
+class DriverPool:
+    """
+    Pool de navegadores Chrome precalentados y compartidos entre servicios.
+
+    Los navegadores se lanzan por adelantado con la sesión guardada (ver
+    SessionStore) y quedan posicionados en booking.php, de modo que cada tarea
+    evita el arranque en frío de Chrome y la primera carga de Skedway.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # Solo inicializar una vez
+        if not self._initialized:
+            settings = Settings()
+            # Al menos un navegador por trabajador de la cola
+            self.size = max(1, settings.driver_pool_size, settings.max_workers)
+            self.max_uses = settings.driver_max_uses
+            self.checkout_timeout = settings.driver_checkout_timeout
+            self.warm_url = f"{settings.base_url}/booking.php?baseType=4"
+            self.logger = logging.getLogger(__name__)
+            self.factory = DriverFactory()
+            self.sessions = SessionStore()
+            self._idle: List[PooledDriver] = []
+            # Navegadores vivos: libres, prestados y en proceso de creación
+            self._total = 0
+            self._closed = False
+            self._condition = Condition()
+            self.metrics = {
+                "hits": 0,
+                "misses": 0,
+                "waits": 0,
+                "wait_seconds": 0.0,
+                "timeouts": 0,
+                "created": 0,
+                "recycled": 0,
+                "unhealthy": 0,
+                "rss_bytes_last": 0,
+                "rss_bytes_max": 0
+            }
+            self._initialized = True
+
+    def _create_driver(self) -> PooledDriver:
+        """Lanza un nuevo Chrome y lo deja posicionado en booking.php"""
+        driver = self.factory.create()
+        self.sessions.install(driver)
+        try:
+            timed_get(driver, self.warm_url, "booking")
+            if self.sessions.is_valid(driver):
+                self.sessions.save(driver)
+        except Exception as e:
+            self.logger.warning(f"Error precargando booking.php: {str(e)}")
+        with self._condition:
+            self.metrics["created"] += 1
+        return PooledDriver(driver=driver)
+
+    def _is_healthy(self, pooled: PooledDriver) -> bool:
+        """Verifica que el navegador siga respondiendo"""
+        try:
+            pooled.driver.execute_script("return document.readyState")
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, pooled: PooledDriver):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            self.logger.warning(f"Error cerrando navegador del pool: {str(e)}")
+
+    def _discard(self, pooled: PooledDriver):
+        """Cierra un navegador y libera su lugar en el pool"""
+        self._quit(pooled)
+        with self._condition:
+            self._total -= 1
+            self._condition.notify()
+
+    def warm_up(self):
+        """Lanza en segundo plano los navegadores faltantes hasta completar el pool"""
+        Thread(target=self._fill, daemon=True).start()
+
+    def _fill(self):
+        while True:
+            with self._condition:
+                if self._closed or self._total >= self.size:
+                    return
+                self._total += 1
+            try:
+                pooled = self._create_driver()
+            except Exception as e:
+                self.logger.error(f"Error precalentando navegador: {str(e)}")
+                with self._condition:
+                    self._total -= 1
+                    self._condition.notify()
+                return
+            with self._condition:
+                if self._closed:
+                    self._total -= 1
+                    closed = True
+                else:
+                    self._idle.append(pooled)
+                    self._condition.notify()
+                    closed = False
+            if closed:
+                self._quit(pooled)
+                return
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledDriver:
+        """
+        Obtiene un navegador del pool
+
+        Args:
+            timeout: Segundos máximos de espera por un navegador libre
+                (default: Settings.driver_checkout_timeout)
+        """
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            with self._condition:
+                if self._closed:
+                    raise RuntimeError("El pool de navegadores está cerrado")
+                if self._idle:
+                    pooled = self._idle.pop()
+                elif self._total < self.size:
+                    self._total += 1
+                    pooled = None
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.metrics["timeouts"] += 1
+                        raise TimeoutError("No hay navegadores disponibles en el pool")
+                    waited = True
+                    self._condition.wait(remaining)
+                    continue
+
+            if pooled is not None:
+                if self._is_healthy(pooled):
+                    self._record_checkout("hits", waited, started)
+                    return pooled
+                self.logger.warning("Navegador del pool no responde, descartándolo")
+                with self._condition:
+                    self.metrics["unhealthy"] += 1
+                self._discard(pooled)
+                continue
+
+            try:
+                pooled = self._create_driver()
+            except Exception:
+                with self._condition:
+                    self._total -= 1
+                    self._condition.notify()
+                raise
+            self._record_checkout("misses", waited, started)
+            return pooled
+
+    def _record_checkout(self, kind: str, waited: bool, started: float):
+        with self._condition:
+            self.metrics[kind] += 1
+            if waited:
+                self.metrics["waits"] += 1
+                self.metrics["wait_seconds"] += time.monotonic() - started
+
+    def release(self, pooled: PooledDriver, failed: bool = False):
+        """
+        Devuelve un navegador al pool
+
+        Args:
+            pooled: Navegador obtenido con acquire()
+            failed: Si la tarea terminó con error; se verifica que el navegador siga vivo
+        """
+        pooled.uses += 1
+        self._record_rss(pooled)
+        recycle = pooled.uses >= self.max_uses
+        if failed and not recycle and not self._is_healthy(pooled):
+            with self._condition:
+                self.metrics["unhealthy"] += 1
+            recycle = True
+
+        with self._condition:
+            if not recycle and not self._closed:
+                self._idle.append(pooled)
+                self._condition.notify()
+                return
+            self.metrics["recycled"] += 1
+
+        self._discard(pooled)
+        if not self._closed:
+            self.warm_up()
+
+    def _record_rss(self, pooled: PooledDriver):
+        """Muestrea la memoria del navegador al devolverlo (requiere psutil)"""
+        rss = driver_rss_bytes(pooled.driver)
+        if rss is None:
+            return
+        with self._condition:
+            self.metrics["rss_bytes_last"] = rss
+            self.metrics["rss_bytes_max"] = max(self.metrics["rss_bytes_max"], rss)
+
+    @contextmanager
+    def driver(self, timeout: Optional[float] = None):
+        """Context manager que presta un navegador y lo devuelve al terminar"""
+        with span("pool", "checkout"):
+            pooled = self.acquire(timeout)
+        failed = False
+        try:
+            yield pooled.driver
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.release(pooled, failed)
+
+    def stats(self) -> dict:
+        """Retorna el estado actual y las métricas del pool"""
+        with self._condition:
+            lookups = self.metrics["hits"] + self.metrics["misses"]
+            return {
+                "size": self.size,
+                "alive": self._total,
+                "idle": len(self._idle),
+                "in_use": self._total - len(self._idle),
+                "hit_ratio": self.metrics["hits"] / lookups if lookups else 0.0,
+                **self.metrics
+            }
+
+    def close(self):
+        """Cierra todos los navegadores libres; los prestados se cierran al devolverse"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._condition.notify_all()
+        for pooled in idle:
+            self._quit(pooled)
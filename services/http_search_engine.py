@@ -0,0 +1,215 @@
+from html.parser import HTMLParser
+from http.cookiejar import CookieJar, Cookie
+from urllib.request import build_opener, HTTPCookieProcessor, Request
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from models.schemas import SearchRequest
+from services.listing_urls import listing_params, listing_url, base_type_for, site_id_for
+from config.settings import Settings
+import logging
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+class ListingParser(HTMLParser):
+    """
+    Parsea el HTML de booking.php sin navegador.
+
+    Extrae las opciones de los selectores de sede y piso, los espacios del listado
+    con sus bloques libres (mismo formato que SPACES_EXTRACTION_SCRIPT) y los
+    números de página disponibles en la paginación.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.selects: Dict[str, List[Tuple[str, str, bool]]] = {}
+        self.spaces: List[Dict] = []
+        self.pages = set()
+        self._select_id = None
+        self._option = None
+        self._space = None
+        self._space_depth = 0
+        self._in_title = False
+        self._title_parts: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+
+        if tag == "select":
+            self._select_id = attrs.get("id")
+            if self._select_id:
+                self.selects.setdefault(self._select_id, [])
+        elif tag == "option" and self._select_id:
+            self._option = [attrs.get("value") or "", "", "selected" in attrs]
+        elif tag == "a" and "page-link" in classes and attrs.get("data-page"):
+            self.pages.add(attrs["data-page"])
+
+        if self._space is not None:
+            if tag not in VOID_TAGS:
+                self._space_depth += 1
+            if tag == "h5" and self._space["name"] is None and not self._in_title:
+                self._in_title = True
+                self._title_parts = []
+            elif "block-free" in classes:
+                self._space["blocks"].append([attrs.get("data-time-start"), attrs.get("data-time-end")])
+        elif tag == "div" and "scheduler-space" in classes:
+            self._space = {"id": attrs.get("data-space-id"), "name": None, "blocks": []}
+            self._space_depth = 1
+
+    def handle_startendtag(self, tag, attrs):
+        # Elementos auto-cerrados: no abren un nivel de anidamiento
+        self.handle_starttag(tag, attrs)
+        if self._space is not None and tag not in VOID_TAGS and self._space_depth > 1:
+            self._space_depth -= 1
+
+    def handle_endtag(self, tag):
+        if tag == "option" and self._option is not None:
+            value, text, selected = self._option
+            self.selects[self._select_id].append((value, text.strip(), selected))
+            self._option = None
+        elif tag == "select":
+            self._select_id = None
+
+        if self._space is not None and tag not in VOID_TAGS:
+            if tag == "h5" and self._in_title:
+                self._in_title = False
+                self._space["name"] = " ".join("".join(self._title_parts).split())
+            self._space_depth -= 1
+            if self._space_depth == 0:
+                self.spaces.append(self._space)
+                self._space = None
+
+    def handle_data(self, data):
+        if self._option is not None:
+            self._option[1] += data
+        if self._in_title:
+            self._title_parts.append(data)
+
+class HttpSearchEngine:
+    """
+    Motor de búsqueda sin navegador: descarga el listado de booking.php con un
+    cliente HTTP y parsea el HTML directamente.
+
+    Mantiene una sesión de cookies compartida entre búsquedas. Si la sesión está
+    vacía, la inicializa copiando las cookies de un navegador del pool, que ya
+    tiene la sesión de Skedway abierta. Para probarlo sin conexión basta con
+    apuntar Settings.base_url a un servidor local que sirva páginas grabadas.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # Solo inicializar una vez
+        if not self._initialized:
+            settings = Settings()
+            self.base_url = f"{settings.base_url}/booking.php"
+            self.timeout = settings.http_timeout
+            self.seed_from_browser = settings.http_seed_cookies_from_browser
+            self.cookie_jar = CookieJar()
+            self.opener = build_opener(HTTPCookieProcessor(self.cookie_jar))
+            self.logger = logging.getLogger(__name__)
+            self._seed_lock = Lock()
+            self._initialized = True
+
+    def _ensure_session(self):
+        """
+        Inicializa la sesión HTTP si está vacía: con las cookies guardadas por
+        SessionStore o, si no hay, con las de un navegador del pool
+        """
+        if not self.seed_from_browser:
+            return
+        with self._seed_lock:
+            if len(self.cookie_jar):
+                return
+            # Import local, como el del pool
+            from services.session_store import SessionStore
+            stored = SessionStore().cookies()
+            if stored:
+                for cookie in stored:
+                    self.cookie_jar.set_cookie(self._cookie_from_browser(cookie))
+                self.logger.info(f"Sesión HTTP inicializada con {len(self.cookie_jar)} cookies guardadas")
+                return
+            # Import local: el pool solo es necesario para inicializar la sesión
+            from services.driver_pool import DriverPool
+            with DriverPool().driver() as driver:
+                for cookie in driver.get_cookies():
+                    self.cookie_jar.set_cookie(self._cookie_from_browser(cookie))
+            self.logger.info(f"Sesión HTTP inicializada con {len(self.cookie_jar)} cookies del navegador")
+
+    def _cookie_from_browser(self, cookie: dict) -> Cookie:
+        domain = cookie.get("domain", "")
+        return Cookie(
+            version=0,
+            name=cookie["name"],
+            value=cookie["value"],
+            port=None,
+            port_specified=False,
+            domain=domain,
+            domain_specified=bool(domain),
+            domain_initial_dot=domain.startswith("."),
+            path=cookie.get("path", "/"),
+            path_specified=True,
+            secure=cookie.get("secure", False),
+            expires=cookie.get("expiry"),
+            discard=False,
+            comment=None,
+            comment_url=None,
+            rest={"HttpOnly": None} if cookie.get("httpOnly") else {}
+        )
+
+    def _fetch(self, params: dict) -> ListingParser:
+        url = listing_url(self.base_url, params)
+        request = Request(url, headers={"User-Agent": "Mozilla/5.0"})
+        with self.opener.open(request, timeout=self.timeout) as response:
+            charset = response.headers.get_content_charset() or "utf-8"
+            html = response.read().decode(charset, errors="replace")
+        parser = ListingParser()
+        parser.feed(html)
+        parser.close()
+        return parser
+
+    def _listing_floors(self, request: SearchRequest) -> Tuple[Optional[str], List[Tuple[str, str, bool]]]:
+        """Id de la sede pedida y opciones de piso del listado filtrado por esa sede"""
+        landing = self._fetch({"baseType": base_type_for(request.booking_type)})
+        site_id = site_id_for(landing.selects.get("companySiteId", []), request.building)
+
+        # Las opciones de piso dependen de la sede seleccionada
+        filtered = self._fetch(listing_params(request, site_id))
+        return site_id, filtered.selects.get("floorId") or landing.selects.get("floorId", [])
+
+    def fetch_listing(self, request: SearchRequest, max_pages: int) -> List[Tuple[str, int, List[Dict]]]:
+        """
+        Descarga el listado de todos los pisos y páginas
+
+        Returns:
+            Lista de (piso, página, espacios crudos) en el orden recorrido
+        """
+        self._ensure_session()
+        site_id, floors = self._listing_floors(request)
+        if not floors:
+            # Sin pisos el servidor respondió el login: la sesión del jar expiró
+            self.logger.warning("La sesión HTTP expiró, reinicializándola")
+            self.cookie_jar.clear()
+            self._ensure_session()
+            site_id, floors = self._listing_floors(request)
+        if not floors:
+            raise Exception("No se encontraron pisos en el listado; la sesión puede haber expirado")
+
+        results = []
+        for floor_id, floor_name, _ in floors:
+            self.logger.info(f"Buscando (HTTP) en piso: {floor_name}")
+            page = 1
+            while page <= max_pages:
+                parser = self._fetch(listing_params(request, site_id, floor_id, page))
+                if not parser.spaces:
+                    break
+                results.append((floor_name, page, parser.spaces))
+                if str(page + 1) not in parser.pages:
+                    break
+                page += 1
+        return results
@@ -0,0 +1,149 @@
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional: sin él se usa la versión con enteros
+    np = None
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+def slot_index(time_str: str) -> int:
+    """Índice del bloque de 30 minutos que empieza en time_str ("HH:MM")"""
+    hours, minutes = time_str.split(":")[:2]
+    return (int(hours) * 60 + int(minutes)) // SLOT_MINUTES
+
+def slot_time(index: int) -> str:
+    """Horario "HH:MM" de inicio del bloque index"""
+    minutes = index * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def blocks_to_mask(blocks: Iterable[Sequence[str]]) -> int:
+    """
+    Convierte bloques libres [[inicio, fin], ...] en una máscara de bits del día:
+    el bit i indica que el bloque i (de 30 minutos) está libre
+
+    A diferencia del recorrido anterior de los bloques, un hueco de 30 minutos
+    corta el tramo (antes se unía y el hueco contaba como libre), el orden de los
+    bloques no importa y un bloque de más de 30 minutos cuenta por todo su largo
+    (antes sumaba 30 minutos por bloque).
+    """
+    mask = 0
+    for start, end in blocks:
+        if not start or not end:
+            continue
+        first, last = slot_index(start), slot_index(end)
+        for index in range(first, max(last, first + 1)):
+            if 0 <= index < SLOTS_PER_DAY:
+                mask |= 1 << index
+    return mask
+
+def free_runs(mask: int, first: int = 0, last: int = SLOTS_PER_DAY) -> List[Tuple[int, int]]:
+    """Tramos libres consecutivos de la máscara dentro de [first, last) como (inicio, largo)"""
+    runs = []
+    start = None
+    for index in range(first, last):
+        if mask >> index & 1:
+            if start is None:
+                start = index
+        elif start is not None:
+            runs.append((start, index - start))
+            start = None
+    if start is not None:
+        runs.append((start, last - start))
+    return runs
+
+def longest_run(mask: int, first: int = 0, last: int = SLOTS_PER_DAY) -> Tuple[int, int]:
+    """Tramo libre más largo como (inicio, largo); ante empate gana el más temprano"""
+    best = (0, 0)
+    for start, length in free_runs(mask, first, last):
+        if length > best[1]:
+            best = (start, length)
+    return best
+
+@dataclass
+class Ranking:
+    """Resultado del ranking de un conjunto de máscaras para una franja horaria"""
+    order: List[int]  # Índices de las máscaras, mejor primero
+    scores: List[float]
+    run_starts: List[int]
+    run_lengths: List[int]  # En bloques de 30 minutos
+    coverage: List[float]  # Fracción de la franja pedida que está libre
+    candidates: List[List[Tuple[int, int]]]  # Tramos libres (inicio, largo), más largo primero; solo para el top
+
+def _score(run_minutes: float, duration: float) -> float:
+    """Tramo continuo de una hora o más suma 20; cubrir la duración pedida suma 100, si no, proporcional hasta 40"""
+    score = 20.0 if run_minutes >= 60 else 0.0
+    if run_minutes >= duration:
+        return score + 100
+    return score + (run_minutes / duration) * 40
+
+def rank_masks(masks: Sequence[int], start_time: str, end_time: str,
+               top: Optional[int] = None, max_candidates: int = 3) -> Ranking:
+    """
+    Rankea todas las máscaras para la franja [start_time, end_time) en una sola pasada
+
+    El score mantiene el criterio histórico (tramo continuo más largo contra la
+    duración pedida) calculado dentro de la franja; los empates se resuelven por
+    cobertura de la franja. Con numpy el cálculo es vectorizado sobre todos los
+    espacios. Las ventanas candidatas se calculan solo para los primeros top.
+    """
+    first, last = slot_index(start_time), slot_index(end_time)
+    last = max(last, first + 1)
+    duration = (last - first) * SLOT_MINUTES
+
+    if np is not None and masks:
+        ranking = _rank_numpy(masks, first, last, duration)
+    else:
+        ranking = _rank_python(masks, first, last, duration)
+
+    for index in ranking.order[:top]:
+        runs = free_runs(masks[index], first, last)
+        ranking.candidates[index] = sorted(runs, key=lambda run: (-run[1], run[0]))[:max_candidates]
+    return ranking
+
+def _rank_python(masks: Sequence[int], first: int, last: int, duration: int) -> Ranking:
+    scores, run_starts, run_lengths, coverage = [], [], [], []
+    window = ((1 << (last - first)) - 1) << first
+    for mask in masks:
+        start, length = longest_run(mask, first, last)
+        run_starts.append(start)
+        run_lengths.append(length)
+        coverage.append(bin(mask & window).count("1") / (last - first))
+        scores.append(_score(length * SLOT_MINUTES, duration))
+    order = sorted(range(len(masks)), key=lambda i: (-scores[i], -coverage[i], i))
+    return Ranking(order, scores, run_starts, run_lengths, coverage, [[] for _ in masks])
+
+def _rank_numpy(masks: Sequence[int], first: int, last: int, duration: int) -> Ranking:
+    width = last - first
+    # Matriz (espacios x bloques) de la franja pedida
+    bits = ((np.array(masks, dtype=np.uint64)[:, None] >> np.arange(first, last, dtype=np.uint64))
+            & np.uint64(1)).astype(bool)
+
+    # Largo del tramo libre que termina en cada columna, para todos los espacios a la vez
+    run = np.zeros(len(masks), dtype=np.int32)
+    best = np.zeros(len(masks), dtype=np.int32)
+    best_end = np.zeros(len(masks), dtype=np.int32)
+    for column in range(width):
+        run = (run + 1) * bits[:, column]
+        improved = run > best
+        best = np.where(improved, run, best)
+        best_end = np.where(improved, column, best_end)
+
+    run_minutes = best * SLOT_MINUTES
+    scores = np.where(run_minutes >= 60, 20.0, 0.0) + np.where(
+        run_minutes >= duration, 100.0, run_minutes / duration * 40
+    )
+    coverage = bits.sum(axis=1) / width
+    order = np.lexsort((np.arange(len(masks)), -coverage, -scores))
+
+    run_starts = np.where(best > 0, first + best_end - best + 1, 0)
+    return Ranking(
+        order=order.tolist(),
+        scores=scores.tolist(),
+        run_starts=run_starts.tolist(),
+        run_lengths=best.tolist(),
+        coverage=coverage.tolist(),
+        candidates=[[] for _ in masks]
+    )
@@ -0,0 +1,63 @@
+from typing import Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+from models.schemas import SearchRequest
+
+# Extrae en un solo round trip los ids de sedes y pisos de los selectores del listado
+LISTING_IDS_SCRIPT = """
+function options(id) {
+    var select = document.getElementById(id);
+    return select ? Array.from(select.options).map(function (option) {
+        return [option.value, option.text.trim()];
+    }) : [];
+}
+return JSON.stringify({sites: options('companySiteId'), floors: options('floorId')});
+"""
+
+def base_type_for(booking_type: str) -> str:
+    """baseType de Skedway: 4 para estacionamientos, 1 para puestos"""
+    return "4" if booking_type == "parking" else "1"
+
+def listing_params(request: SearchRequest, site_id: Optional[str] = None,
+                   floor_id: Optional[str] = None, page: int = 1) -> dict:
+    """
+    Parámetros de booking.php que fijan filtros y página del listado
+
+    Con ellos cada combinación de piso y página es direccionable por URL, sin
+    pasar por los filtros ni la paginación de la interfaz.
+    """
+    params = {
+        "baseType": base_type_for(request.booking_type),
+        "day": request.date,
+        "startTime": request.start_time,
+        "endTime": request.end_time,
+        "spaceType": "0",
+        "order": "availabilityDesc",
+        "page": str(page)
+    }
+    if site_id:
+        params["companySiteId"] = site_id
+    if floor_id:
+        params["floorId"] = floor_id
+    return params
+
+def listing_url(base_url: str, params: dict) -> str:
+    """URL del listado; base_url apunta a booking.php"""
+    return f"{base_url}?{urlencode(params)}"
+
+def is_listing_url(url: str, base_url: str, base_type: str) -> bool:
+    """
+    url es el listado de base_url con el baseType pedido
+
+    Compara la ruta y el parámetro baseType, no el texto de la URL: un navegador
+    que quedó en booking-form.php?...&from=/booking.php?baseType=4 no está en el listado.
+    """
+    current, expected = urlparse(url), urlparse(base_url)
+    return (current.netloc == expected.netloc and current.path == expected.path
+            and parse_qs(current.query).get("baseType") == [base_type])
+
+def site_id_for(sites, building: str) -> Optional[str]:
+    """Id de la primera sede cuyo nombre contiene building (mismo criterio que los filtros)"""
+    for value, text, *_ in sites:
+        if building in text:
+            return value
+    return None
@@ -0,0 +1,181 @@
+from contextlib import contextmanager
+from threading import Lock, local
+from typing import Dict, Iterable, List, Optional, Tuple
+import time
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """Histograma con etiquetas en formato Prometheus"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...],
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, dict] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = dict(zip(self.label_names, key))
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    bucket_labels = _format_labels({**labels, "le": _format_value(float(bound))})
+                    lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+                inf_labels = _format_labels({**labels, "le": "+Inf"})
+                lines.append(f"{self.name}_bucket{inf_labels} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {series['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {series['count']}")
+        return lines
+
+class MetricsRegistry:
+    """Registro de histogramas del proceso expuestos en /metrics"""
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # Solo inicializar una vez
+        if not self._initialized:
+            self._histograms: Dict[str, Histogram] = {}
+            self._lock = Lock()
+            self._initialized = True
+
+    def histogram(self, name: str, help_text: str, label_names: Tuple[str, ...],
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name, help_text, label_names, buckets)
+            return self._histograms[name]
+
+    def render(self, gauges: Optional[Dict[str, dict]] = None) -> str:
+        """
+        Genera el texto de exposición de Prometheus
+
+        Args:
+            gauges: {prefijo: stats} con diccionarios de estadísticas de los servicios;
+                cada valor numérico se expone como gauge {prefijo}_{clave}
+        """
+        lines = []
+        with self._lock:
+            histograms = list(self._histograms.values())
+        for histogram in histograms:
+            lines.extend(histogram.render())
+        for prefix, stats in (gauges or {}).items():
+            lines.extend(format_gauges(prefix, stats))
+        return "\n".join(lines) + "\n"
+
+def format_gauges(prefix: str, stats: dict) -> List[str]:
+    """
+    Convierte un diccionario de estadísticas en gauges {prefijo}_{clave}
+
+    Los subdiccionarios (p. ej. estadísticas por nombre de espera) se exponen con
+    la etiqueta name.
+    """
+    families: Dict[str, List[Tuple[dict, float]]] = {}
+
+    def collect(values: dict, labels: dict):
+        for key, value in values.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                families.setdefault(f"{prefix}_{key}", []).append((labels, value))
+            elif isinstance(value, dict) and not labels:
+                collect(value, {"name": key})
+
+    collect(stats, {})
+    lines = []
+    for name, samples in families.items():
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+    return lines
+
+PHASE_SECONDS = MetricsRegistry().histogram(
+    "reserva_phase_duration_seconds",
+    "Duración de cada fase de búsqueda y reserva",
+    ("service", "phase")
+)
+
+class TaskTimings:
+    """Desglose de tiempos por fase de una tarea"""
+
+    def __init__(self):
+        self.phases: Dict[str, dict] = {}
+        self._lock = Lock()
+
+    def add(self, phase: str, seconds: float):
+        with self._lock:
+            entry = self.phases.setdefault(phase, {"count": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += seconds
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                phase: {"count": entry["count"], "seconds": round(entry["seconds"], 3)}
+                for phase, entry in self.phases.items()
+            }
+
+_current = local()
+
+def current_timings() -> Optional[TaskTimings]:
+    """Retorna el desglose de la tarea que se ejecuta en este thread"""
+    return getattr(_current, "timings", None)
+
+@contextmanager
+def bind_timings(timings: Optional[TaskTimings]):
+    """Asocia un desglose de tiempos al thread actual (p. ej. threads auxiliares de una tarea)"""
+    previous = current_timings()
+    _current.timings = timings
+    try:
+        yield timings
+    finally:
+        _current.timings = previous
+
+@contextmanager
+def span(service: str, phase: str):
+    """Mide una fase: la registra en el histograma y en el desglose de la tarea actual"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        elapsed = time.monotonic() - started
+        PHASE_SECONDS.observe(elapsed, service=service, phase=phase)
+        timings = current_timings()
+        if timings is not None:
+            timings.add(f"{service}.{phase}", elapsed)
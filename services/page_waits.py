@@ -0,0 +1,175 @@
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+from threading import Lock
+from typing import Callable
+from services.metrics import MetricsRegistry
+from services.timing_model import TimingModel, current_deadline
+import logging
+import time
+
+WAIT_SECONDS = MetricsRegistry().histogram(
+    "reserva_page_wait_seconds",
+    "Duración real de las esperas del DOM",
+    ("wait", "signaled")
+)
+
+class WaitStats:
+    """Acumula cuánto tardó realmente cada espera comparado con el sleep fijo que reemplaza"""
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not self._initialized:
+            self._lock = Lock()
+            self.waits = {}
+            self._initialized = True
+
+    def record(self, name: str, elapsed: float, budget: float, signaled: bool):
+        with self._lock:
+            entry = self.waits.setdefault(name, {
+                "count": 0,
+                "fallbacks": 0,
+                "seconds_total": 0.0,
+                "seconds_max": 0.0,
+                "seconds_saved": 0.0
+            })
+            entry["count"] += 1
+            entry["seconds_total"] += elapsed
+            entry["seconds_max"] = max(entry["seconds_max"], elapsed)
+            entry["seconds_saved"] += max(0.0, budget - elapsed)
+            if not signaled:
+                entry["fallbacks"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(entry) for name, entry in self.waits.items()}
+
+class PageWaiter:
+    """
+    Esperas basadas en señales concretas del DOM en lugar de time.sleep fijos.
+
+    Cada espera tiene como tope el sleep fijo que reemplaza: si la señal no llega
+    a tiempo se continúa igual que antes, así que en el peor caso se espera lo
+    mismo que con el sleep original. El tope se reduce según las latencias
+    observadas de la espera (TimingModel) y el presupuesto de la tarea.
+    """
+
+    def __init__(self, driver: webdriver.Chrome, poll_frequency: float = 0.1):
+        self.driver = driver
+        self.poll_frequency = poll_frequency
+        self.stats = WaitStats()
+        self.logger = logging.getLogger(__name__)
+
+    def wait(self, name: str, condition: Callable, budget: float) -> bool:
+        """
+        Espera hasta que condition sea verdadera o se agote budget
+
+        Returns:
+            True si llegó la señal, False si se usó el tope de tiempo como fallback
+        """
+        budget = min(budget, TimingModel().timeout(name, budget))
+        deadline = current_deadline()
+        if deadline is not None:
+            # Sin lanzar aunque el presupuesto se haya agotado: estas esperas también
+            # se usan en limpiezas (finally) y no deben tapar el error original
+            budget = max(0.0, min(budget, deadline.remaining()))
+        started = time.monotonic()
+        signaled = True
+        try:
+            WebDriverWait(
+                self.driver,
+                budget,
+                poll_frequency=self.poll_frequency,
+                ignored_exceptions=(StaleElementReferenceException,)
+            ).until(condition)
+        except TimeoutException:
+            signaled = False
+            remaining = budget - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+        elapsed = time.monotonic() - started
+        TimingModel().observe(name, elapsed, timed_out=not signaled)
+        self.stats.record(name, elapsed, budget, signaled)
+        WAIT_SECONDS.observe(elapsed, wait=name, signaled=str(signaled).lower())
+        if signaled:
+            self.logger.debug(f"Espera '{name}' resuelta en {elapsed:.2f}s (tope {budget}s)")
+        else:
+            self.logger.info(f"Espera '{name}' sin señal, fallback de {elapsed:.2f}s")
+        return signaled
+
+    def document_ready(self, budget: float) -> bool:
+        return self.wait(
+            "document_ready",
+            lambda d: d.execute_script("return document.readyState") == "complete",
+            budget
+        )
+
+    def navigated(self, budget: float) -> bool:
+        """Espera a que cargue la navegación iniciada con start_navigation"""
+        return self.wait(
+            "navigated",
+            lambda d: d.execute_script(
+                "return !window.__navigationPending && document.readyState !== 'loading'"
+            ),
+            budget
+        )
+
+    def start_navigation(self, url: str):
+        """
+        Inicia una navegación sin esperar a que termine (driver.get bloquea)
+
+        Marca el documento actual para que navigated distinga el documento nuevo del viejo.
+        """
+        self.driver.execute_script(
+            "window.__navigationPending = true; window.location.href = arguments[0];", url
+        )
+
+    def loading_finished(self, budget: float) -> bool:
+        """Espera a que desaparezca el indicador de carga"""
+        return self.wait(
+            "loading_finished",
+            lambda d: d.execute_script("return document.readyState") == "complete" and
+                      EC.invisibility_of_element_located((By.CLASS_NAME, "loading-indicator"))(d),
+            budget
+        )
+
+    def element_gone(self, name: str, locator: tuple, budget: float) -> bool:
+        return self.wait(name, EC.invisibility_of_element_located(locator), budget)
+
+    def first_space(self):
+        """Retorna el primer espacio renderizado para detectar un re-render posterior"""
+        spaces = self.driver.find_elements(By.CLASS_NAME, "scheduler-space")
+        return spaces[0] if spaces else None
+
+    def spaces_rerendered(self, previous, budget: float) -> bool:
+        """
+        Espera a que la lista de espacios se vuelva a renderizar
+
+        Args:
+            previous: Elemento obtenido con first_space() antes de la acción
+        """
+        def rerendered(d):
+            if previous is not None and not EC.staleness_of(previous)(d):
+                return False
+            return bool(d.find_elements(By.CLASS_NAME, "scheduler-space")) and \
+                EC.invisibility_of_element_located((By.CLASS_NAME, "loading-indicator"))(d)
+
+        return self.wait("spaces_rerendered", rerendered, budget)
+
+    def active_page(self, page: int, budget: float, previous=None) -> bool:
+        """Espera a que el item activo de la paginación sea page y la lista se actualice"""
+        def page_changed(d):
+            active = d.find_elements(By.CSS_SELECTOR, "li.page-item.active a")
+            if not active or active[0].get_attribute("data-page") != str(page):
+                return False
+            return previous is None or EC.staleness_of(previous)(d)
+
+        return self.wait("active_page", page_changed, budget)
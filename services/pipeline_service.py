@@ -0,0 +1,109 @@
+from selenium import webdriver
+from typing import Optional, Tuple
+from models.schemas import SearchRequest, BookingRequest, SearchAndBookRequest
+from services.availability_service import AvailabilityService
+from services.booking_service import BookingService
+from services.driver_pool import DriverPool
+from services.metrics import span
+import asyncio
+import logging
+
+class SearchAndBookService:
+    """
+    Busca y reserva en una sola sesión de navegador.
+
+    Usa el mismo driver del pool para recorrer el listado, rankear los espacios y
+    enviar booking-form.php con el mejor candidato. Si el formulario rechaza un
+    espacio (p. ej. lo tomó otra persona), prueba con el siguiente del ranking.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.pool = DriverPool()
+        self.availability = AvailabilityService()
+        self.booking = BookingService()
+
+    def search_and_book_sync(self, request_data: dict) -> dict:
+        """Versión sincrónica del pipeline, para ejecutarla en un trabajador de la cola"""
+        request = SearchAndBookRequest(**request_data)
+        with self.pool.driver() as driver:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                return loop.run_until_complete(self._search_and_book(driver, request))
+            finally:
+                loop.close()
+
+    async def _search_and_book(self, driver: webdriver.Chrome, request: SearchAndBookRequest) -> dict:
+        search = SearchRequest(
+            booking_type=request.booking_type,
+            date=request.date,
+            start_time=request.start_time,
+            end_time=request.end_time,
+            building=request.building
+        )
+        spaces = await self.availability._perform_search(driver, search, max_pages=request.max_pages)
+        if not spaces:
+            raise Exception("No hay espacios disponibles para los criterios indicados")
+
+        # Ids de sede y pisos del listado en un solo round trip, igual que la búsqueda
+        site_id, floor_ids = self.availability._listing_ids(driver, search)
+        with span("pipeline", "scoring"):
+            ranked = self.availability._rank_spaces(spaces, search, limit=len(spaces))
+
+        attempts = []
+        for space in ranked:
+            if len(attempts) >= request.max_attempts:
+                break
+            window = self._booking_window(space, request)
+            if window is None:
+                continue
+            booking_request = BookingRequest(
+                title=request.title,
+                space_id=space["space_id"],
+                date=request.date,
+                start_time=window[0],
+                end_time=window[1],
+                base_type="4" if request.booking_type == "parking" else "1",
+                **self._location_fields(request, site_id, floor_ids.get(space["floor"]))
+            )
+            try:
+                with span("pipeline", "booking_attempt"):
+                    response = await self.booking._perform_booking(driver, booking_request)
+            except Exception as e:
+                self.logger.warning(f"Reserva rechazada para {space['space_name']}: {str(e)}")
+                attempts.append({"space_id": space["space_id"], "space_name": space["space_name"], "error": str(e)})
+                continue
+
+            return {
+                **response.dict(),
+                "space": space,
+                "start_time": window[0],
+                "end_time": window[1],
+                "attempts": attempts
+            }
+
+        if not attempts:
+            raise Exception("Ningún espacio cubre la franja pedida")
+        raise Exception(f"No se pudo reservar ninguno de los {len(attempts)} candidatos: {attempts}")
+
+    def _booking_window(self, space: dict, request: SearchAndBookRequest) -> Optional[Tuple[str, str]]:
+        """Franja a reservar: la pedida completa o, si se permite, la mejor ventana parcial"""
+        if space["coverage"] >= 1:
+            return request.start_time, request.end_time
+        if request.allow_partial and space["candidate_windows"]:
+            best = space["candidate_windows"][0]
+            return best["start_time"], best["end_time"]
+        return None
+
+    def _location_fields(self, request: SearchAndBookRequest, site_id: Optional[str],
+                         floor_id: Optional[str]) -> dict:
+        """Ids de sede, edificio y piso; los no detectados quedan con el default de BookingRequest"""
+        fields = {}
+        if site_id:
+            fields["location_id"] = site_id
+        if request.building_id:
+            fields["building_id"] = request.building_id
+        if floor_id:
+            fields["floor_id"] = floor_id
+        return fields
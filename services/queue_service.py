@@ -1,15 +1,50 @@
-from queue import Queue
-from threading import Thread
+from collections import OrderedDict
+from queue import Empty
+from threading import Thread, Lock
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 import uuid
+import time
 from datetime import datetime
-from sqlalchemy.orm import Session
 from models.database import Task, SessionLocal
+from config.settings import Settings
 import asyncio
 import json
 import logging
 from concurrent.futures import ThreadPoolExecutor
 from services.availability_service import AvailabilityService
 from services.booking_service import BookingService
+from services.pipeline_service import SearchAndBookService
+from services.availability_cache import AvailabilityCache
+from services.task_store import TaskStore
+from services.task_scheduler import PriorityTaskQueue, PRIORITY_CLASSES, priority_class_for
+from services.metrics import MetricsRegistry, TaskTimings, bind_timings
+from services.search_progress import ProgressCallback, bind_progress
+from services.timing_model import Deadline, bind_deadline
+
+QUEUE_WAIT_SECONDS = MetricsRegistry().histogram(
+    "reserva_queue_wait_seconds",
+    "Tiempo en cola hasta que un trabajador toma la tarea",
+    ("request_type", "priority_class")
+)
+TASK_EXECUTION_SECONDS = MetricsRegistry().histogram(
+    "reserva_task_execution_seconds",
+    "Tiempo de ejecución de las tareas",
+    ("request_type", "status")
+)
+
+TERMINAL_STATUSES = ("COMPLETED", "FAILED")
+
+@dataclass
+class WorkerState:
+    """Estado de un trabajador del pool de ejecución"""
+    worker_id: int
+    loop: asyncio.AbstractEventLoop
+    thread: Optional[Thread] = None
+    current_task_id: Optional[str] = None
+    busy_since: Optional[datetime] = None
+    processed: int = 0
+    failed: int = 0
 
 class QueueService:
     _instance = None
@@ -23,61 +58,420 @@ class QueueService:
     def __init__(self):
         # Solo inicializar una vez
         if not self._initialized:
-            self.task_queue = Queue()
+            settings = Settings()
+            self.max_workers = max(1, settings.max_workers)
+            self.task_queue = PriorityTaskQueue(
+                aging_seconds=settings.scheduler_aging_seconds,
+                deadline_horizon=settings.scheduler_deadline_horizon
+            )
+            # Tareas en cola por task_id, para subir la prioridad de un líder al sumarse seguidores
+            self._queued: Dict[str, dict] = {}
             self.is_running = True
-            # Crear el loop antes de iniciar el thread
-            self.loop = asyncio.new_event_loop()
-            self.executor = ThreadPoolExecutor(max_workers=1)
-            self.worker_thread = Thread(target=self._process_queue)
-            self.worker_thread.daemon = True
-            self.worker_thread.start()
+            self.cache = AvailabilityCache()
+            self.store = TaskStore()
+            self.store_task_timings = settings.store_task_timings
+            # Búsquedas en curso por clave: {clave: [task_id líder, seguidores...]}
+            self._inflight: Dict[tuple, List[str]] = {}
+            self._inflight_lock = Lock()
+            # Suscriptores al progreso por tarea ejecutora: {task_id: [(task_id suscripto, callback)]}
+            self._subscribers: Dict[str, List[Tuple[str, ProgressCallback]]] = {}
+            self.coalescing_stats = {
+                "searches": 0,
+                "executions": 0,
+                "coalesced": 0
+            }
+            # Último estado conocido de las tareas recientes y clientes esperando su fin
+            self._statuses: OrderedDict = OrderedDict()
+            self._status_waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+            self._status_lock = Lock()
+            self.status_memory = max(1, settings.task_status_memory)
+            self.max_status_wait = settings.task_wait_max_seconds
+            self.time_budgets = dict(settings.task_time_budgets)
+            self.poll_timeout = 1.0
+            self._stats_lock = Lock()
+            self.dispatch_stats = {
+                "dispatched": 0,
+                "latency_seconds_total": 0.0,
+                "latency_seconds_max": 0.0,
+                "queue_wait_seconds_total": 0.0
+            }
+            self.class_stats = {
+                name: {"dispatched": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0, "expired": 0}
+                for name in PRIORITY_CLASSES
+            }
+            # Un thread de ejecución por trabajador; cada tarea usa su propio navegador del pool
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            self.workers: List[WorkerState] = []
+            for worker_id in range(self.max_workers):
+                # Crear el loop antes de iniciar el thread
+                state = WorkerState(worker_id=worker_id, loop=asyncio.new_event_loop())
+                state.thread = Thread(
+                    target=self._process_queue,
+                    args=(state,),
+                    name=f"queue-worker-{worker_id}"
+                )
+                state.thread.daemon = True
+                self.workers.append(state)
+            for state in self.workers:
+                state.thread.start()
             self._initialized = True
 
-    def _process_queue(self):
-        """Thread principal para procesar la cola"""
+    def _process_queue(self, state: WorkerState):
+        """Thread de un trabajador para procesar la cola"""
         try:
-            asyncio.set_event_loop(self.loop)
+            asyncio.set_event_loop(state.loop)
             while self.is_running:
+                idle_since = time.monotonic()
                 try:
-                    if not self.task_queue.empty():
-                        task = self.task_queue.get()
-                        # Ejecutar la tarea asíncrona en el loop de eventos
-                        self.loop.run_until_complete(self._process_task(task))
-                        self.task_queue.task_done()
+                    # Bloquear hasta que llegue trabajo; el timeout solo revisa is_running
+                    task = self.task_queue.get(timeout=self.poll_timeout)
+                except Empty:
+                    continue
+                if task is None:
+                    # Señal de apagado
+                    self.task_queue.task_done()
+                    break
+                try:
+                    self._record_dispatch(task, idle_since)
+                    self._run_task(state, task)
                 except Exception as e:
                     logging.error(f"Error processing task: {str(e)}")
         except Exception as e:
             logging.error(f"Fatal error in queue processing: {str(e)}")
 
+    def _record_dispatch(self, task, idle_since: float):
+        """
+        Registra la latencia de despacho: tiempo desde que la tarea y un trabajador
+        libre coinciden hasta que el trabajador la toma
+        """
+        now = time.monotonic()
+        enqueued_at = task.get("enqueued_at", now)
+        latency = now - max(enqueued_at, idle_since)
+        with self._stats_lock:
+            self.dispatch_stats["dispatched"] += 1
+            self.dispatch_stats["latency_seconds_total"] += latency
+            self.dispatch_stats["latency_seconds_max"] = max(self.dispatch_stats["latency_seconds_max"], latency)
+            self.dispatch_stats["queue_wait_seconds_total"] += now - enqueued_at
+            class_stats = self.class_stats[task["priority_class"]]
+            class_stats["dispatched"] += 1
+            class_stats["wait_seconds_total"] += now - enqueued_at
+            class_stats["wait_seconds_max"] = max(class_stats["wait_seconds_max"], now - enqueued_at)
+        self._queued.pop(task["task_id"], None)
+        task["queue_wait_seconds"] = now - enqueued_at
+        QUEUE_WAIT_SECONDS.observe(
+            now - enqueued_at, request_type=task["request_type"], priority_class=task["priority_class"]
+        )
+
+    def get_dispatch_stats(self) -> dict:
+        """Retorna las métricas de despacho de la cola"""
+        with self._stats_lock:
+            stats = dict(self.dispatch_stats)
+        dispatched = stats["dispatched"]
+        stats["latency_seconds_avg"] = stats["latency_seconds_total"] / dispatched if dispatched else 0.0
+        stats["queue_wait_seconds_avg"] = stats["queue_wait_seconds_total"] / dispatched if dispatched else 0.0
+        stats["queue_depth"] = self.task_queue.qsize()
+        # Por clase de prioridad (booking, search, prefetch)
+        stats["depth_by_class"] = self.task_queue.depth_by_class()
+        with self._stats_lock:
+            stats["dispatched_by_class"] = {name: entry["dispatched"] for name, entry in self.class_stats.items()}
+            stats["wait_seconds_avg_by_class"] = {
+                name: entry["wait_seconds_total"] / entry["dispatched"] if entry["dispatched"] else 0.0
+                for name, entry in self.class_stats.items()
+            }
+            stats["wait_seconds_max_by_class"] = {name: entry["wait_seconds_max"] for name, entry in self.class_stats.items()}
+            stats["expired_by_class"] = {name: entry["expired"] for name, entry in self.class_stats.items()}
+        return stats
+
+    def _run_task(self, state: WorkerState, task):
+        """Ejecuta una tarea en el loop del trabajador y actualiza su estado"""
+        state.current_task_id = task["task_id"]
+        state.busy_since = datetime.utcnow()
+        try:
+            # Ejecutar la tarea asíncrona en el loop de eventos del trabajador
+            if state.loop.run_until_complete(self._process_task(task)):
+                state.processed += 1
+            else:
+                state.failed += 1
+        finally:
+            state.current_task_id = None
+            state.busy_since = None
+            self.task_queue.task_done()
+
+    def workers_status(self) -> List[dict]:
+        """Retorna el estado de cada trabajador"""
+        return [{
+            "worker_id": state.worker_id,
+            "alive": state.thread.is_alive(),
+            "current_task_id": state.current_task_id,
+            "busy_since": state.busy_since.isoformat() if state.busy_since else None,
+            "processed": state.processed,
+            "failed": state.failed
+        } for state in self.workers]
+
+    def shutdown(self, drain: bool = True, timeout: Optional[float] = None):
+        """
+        Detiene los trabajadores
+
+        Args:
+            drain: Si se espera a que la cola quede vacía antes de detener
+            timeout: Segundos máximos de espera para el drenado y la detención
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        if drain:
+            with self.task_queue.all_tasks_done:
+                while self.task_queue.unfinished_tasks:
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        logging.warning(f"Shutdown sin drenar {self.task_queue.unfinished_tasks} tareas")
+                        break
+                    self.task_queue.all_tasks_done.wait(remaining)
+
+        self.is_running = False
+        # Despertar a los trabajadores bloqueados en la cola
+        for _ in self.workers:
+            self.task_queue.put(None)
+        for state in self.workers:
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            state.thread.join(max(0, remaining) if remaining is not None else None)
+        self.executor.shutdown(wait=False)
+
     async def _process_task(self, task):
-        """Procesa una tarea individual"""
-        db = SessionLocal()
+        """
+        Procesa una tarea individual
+
+        Las transiciones de estado se escriben por lotes en el TaskStore; los
+        clientes que esperan la tarea se despiertan cuando el lote se confirma.
+        """
+        task_id = task["task_id"]
+        timings = TaskTimings()
+        timings.add("queue.wait", task.get("queue_wait_seconds", 0.0))
+        task["timings"] = timings
+        started = time.monotonic()
+        values = {}
         try:
+            deadline = task.get("deadline")
+            if deadline is not None and time.monotonic() > deadline:
+                with self._stats_lock:
+                    self.class_stats[task["priority_class"]]["expired"] += 1
+                raise Exception("El plazo de la tarea venció antes de ejecutarla")
+
             # Actualizar estado a PROCESSING
-            db_task = db.query(Task).filter(Task.task_id == task["task_id"]).first()
-            if db_task:
-                db_task.status = "PROCESSING"
-                db.commit()
+            processing = [task_id, *self._followers(task)]
+            self.store.update(
+                processing, {"status": "PROCESSING"},
+                on_commit=lambda committed: self._set_status(processing, "PROCESSING") if committed else None
+            )
 
+            cached = self._cached_result(task)
+            if cached:
+                # Una búsqueda idéntica terminó mientras esta esperaba en la cola
+                result, fetched_at = cached
+                values["from_cache"] = True
+            else:
                 # Ejecutar la tarea en un executor para permitir operaciones bloqueantes
                 result = await self._execute_task(task)
+                fetched_at = self._store_result(task, result)
+                if task.get("partial"):
+                    values["partial"] = task["partial"]
 
-                # Actualizar resultado
-                db_task.status = "COMPLETED"
-                db_task.result = result
-                db_task.completed_at = datetime.utcnow()
-            else:
-                logging.error(f"Task {task['task_id']} not found in database")
+            # Actualizar resultado
+            values.update({
+                "status": "COMPLETED",
+                "result": result,
+                "result_fetched_at": fetched_at,
+                "completed_at": datetime.utcnow()
+            })
+            return True
                 
         except Exception as e:
-            logging.error(f"Error in task {task['task_id']}: {str(e)}")
-            if db_task:
-                db_task.status = "FAILED"
-                db_task.error = str(e)
-                db_task.completed_at = datetime.utcnow()
+            logging.error(f"Error in task {task_id}: {str(e)}")
+            values.update({
+                "status": "FAILED",
+                "error": str(e),
+                "completed_at": datetime.utcnow()
+            })
+            return False
         finally:
-            db.commit()
-            db.close()
+            self._finish_timings(values, task, started)
+            followers = self._resolve_followers(task)
+            updates = [([task_id], values)]
+            if followers:
+                follower_values = {key: value for key, value in values.items() if key != "timings"}
+                follower_values["coalesced_into"] = task_id
+                updates.append((followers, follower_values))
+            self.store.write(
+                updates,
+                on_commit=lambda committed: self._task_committed(task, [task_id, *followers], values, committed)
+            )
+
+    def _task_committed(self, task, task_ids: List[str], values: dict, committed: bool):
+        """
+        Con el resultado ya confirmado en la base, avisar a quienes esperan la tarea
+
+        Si el lote no se pudo escribir, el resultado se perdió: se informa como error
+        en lugar de como éxito.
+        """
+        if not committed:
+            logging.error(f"No se pudo guardar el resultado de la tarea {task['task_id']}")
+            values = {"status": "FAILED", "error": "No se pudo guardar el resultado de la tarea"}
+        self._set_status(task_ids, values["status"])
+        self._publish_summary(task, values)
+
+    def _finish_timings(self, values: dict, task, started: float):
+        """Registra la duración de la tarea y agrega su desglose por fase a los valores a guardar"""
+        elapsed = time.monotonic() - started
+        TASK_EXECUTION_SECONDS.observe(elapsed, request_type=task["request_type"], status=values.get("status"))
+        timings = task["timings"]
+        timings.add("task.execution", elapsed)
+        if self.store_task_timings:
+            values["timings"] = timings.as_dict()
+
+    def _followers(self, task) -> List[str]:
+        key = task.get("coalesce_key")
+        if key is None:
+            return []
+        with self._inflight_lock:
+            return list(self._inflight.get(key, [])[1:])
+
+    def _resolve_followers(self, task) -> List[str]:
+        """
+        Cierra la búsqueda en curso y retorna los seguidores que reciben el resultado del líder
+        """
+        key = task.get("coalesce_key")
+        if key is None:
+            return []
+        # Sacar la clave antes de copiar: una búsqueda nueva ya encuentra el resultado en cache
+        with self._inflight_lock:
+            return self._inflight.pop(key, [])[1:]
+
+    def _set_status(self, task_ids: List[str], status: str):
+        """
+        Registra en memoria el estado de las tareas (ya confirmado en la base) y
+        despierta a los clientes que esperan su finalización
+        """
+        woken = []
+        with self._status_lock:
+            for task_id in task_ids:
+                self._statuses[task_id] = status
+                self._statuses.move_to_end(task_id)
+                if status in TERMINAL_STATUSES:
+                    woken.extend(self._status_waiters.pop(task_id, []))
+            while len(self._statuses) > self.status_memory:
+                self._statuses.popitem(last=False)
+        for loop, event in woken:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # El loop del cliente ya se cerró
+                pass
+
+    def etag_for(self, task_id: str, status: str) -> str:
+        """ETag del estado de una tarea: el resultado solo cambia junto con el estado"""
+        return f'"{task_id}:{status}"'
+
+    def status_etag(self, task_id: str) -> Optional[str]:
+        """ETag del último estado conocido en memoria, sin consultar la base"""
+        with self._status_lock:
+            status = self._statuses.get(task_id)
+        return self.etag_for(task_id, status) if status else None
+
+    async def wait_for_completion(self, task_id: str, timeout: float) -> Optional[str]:
+        """
+        Espera, sin consultar la base, a que la tarea termine o venza el timeout
+
+        Returns:
+            Último estado conocido en memoria (None si la tarea no es de este proceso)
+        """
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._status_lock:
+            status = self._statuses.get(task_id)
+            if status is None or status in TERMINAL_STATUSES or timeout <= 0:
+                return status
+            self._status_waiters.setdefault(task_id, []).append(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._status_lock:
+                waiters = self._status_waiters.get(task_id)
+                if waiters and waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._status_waiters[task_id]
+        with self._status_lock:
+            return self._statuses.get(task_id)
+
+    def _publish_progress(self, task_id: str, event: str, data: dict):
+        """Reenvía un evento de la tarea ejecutora a todos sus suscriptores"""
+        with self._inflight_lock:
+            subscribers = list(self._subscribers.get(task_id, []))
+        for _, callback in subscribers:
+            try:
+                callback(event, data)
+            except Exception as e:
+                logging.warning(f"Error publicando progreso de {task_id}: {str(e)}")
+
+    def _publish_summary(self, task, values: dict):
+        """Envía el resultado final a los suscriptores de la tarea y los da de baja"""
+        with self._inflight_lock:
+            subscribers = self._subscribers.pop(task["task_id"], [])
+        for task_id, callback in subscribers:
+            try:
+                callback("summary", self._summary(task_id, task["task_id"], values))
+            except Exception as e:
+                logging.warning(f"Error publicando resumen de {task_id}: {str(e)}")
+
+    def _summary(self, task_id: str, leader_id: str, values: dict) -> dict:
+        summary = {"task_id": task_id, "status": values["status"]}
+        if values["status"] == "COMPLETED":
+            fetched_at = values.get("result_fetched_at")
+            summary["result"] = values.get("result")
+            summary["result_fetched_at"] = fetched_at.isoformat() if fetched_at else None
+            summary["from_cache"] = bool(values.get("from_cache"))
+            if values.get("partial"):
+                summary["partial"] = values["partial"]
+        else:
+            summary["error"] = values.get("error")
+        if task_id != leader_id:
+            summary["coalesced_into"] = leader_id
+        return summary
+
+    def _promote(self, task_id: str, priority_class: str):
+        """
+        Una búsqueda compartida hereda la mayor prioridad de sus seguidores
+
+        El plazo no se hereda: si venciera, fallaría la ejecución compartida y con
+        ella todos los seguidores, incluso los que no tenían plazo.
+        """
+        with self.task_queue.mutex:
+            task = self._queued.get(task_id)
+            if task is None:
+                # Ya la tomó un trabajador
+                return
+            if PRIORITY_CLASSES[priority_class] < PRIORITY_CLASSES[task["priority_class"]]:
+                task["priority_class"] = priority_class
+
+    def get_coalescing_stats(self) -> dict:
+        """Retorna cuántas búsquedas se resolvieron compartiendo una ejecución"""
+        with self._inflight_lock:
+            stats = dict(self.coalescing_stats)
+            stats["inflight"] = len(self._inflight)
+        stats["coalescing_ratio"] = stats["coalesced"] / stats["searches"] if stats["searches"] else 0.0
+        return stats
+
+    def _cached_result(self, task):
+        """Retorna (resultado, frescura) desde el cache si la tarea es una búsqueda cacheada"""
+        if task["request_type"] != "search":
+            return None
+        return self.cache.get(task["request_data"])
+
+    def _store_result(self, task, result) -> datetime:
+        """Guarda en cache el resultado completo de una búsqueda y retorna su marca de frescura"""
+        if task["request_type"] != "search" or task.get("partial"):
+            return datetime.utcnow()
+        return self.cache.put(task["request_data"], result)
 
     async def _execute_task(self, task):
         """Ejecuta la tarea específica basada en el tipo"""
@@ -85,16 +479,40 @@ class QueueService:
             if task["request_type"] == "search":
                 service = AvailabilityService()
                 # Ejecutar la búsqueda en un thread separado
-                return await self.loop.run_in_executor(
+                return await asyncio.get_running_loop().run_in_executor(
                     self.executor,
+                    self._run_in_task_context,
+                    task,
                     service.search_available_slots_sync,  # Versión sincrónica del método
                     task["request_data"]
                 )
+            elif task["request_type"] == "booking_batch":
+                service = BookingService()
+                # Todas las reservas del lote con una o pocas sesiones del pool
+                return await asyncio.get_running_loop().run_in_executor(
+                    self.executor,
+                    self._run_in_task_context,
+                    task,
+                    service.make_reservations_batch_sync,
+                    task["request_data"]
+                )
+            elif task["request_type"] == "search_and_book":
+                service = SearchAndBookService()
+                # Buscar y reservar con el mismo navegador en un thread separado
+                return await asyncio.get_running_loop().run_in_executor(
+                    self.executor,
+                    self._run_in_task_context,
+                    task,
+                    service.search_and_book_sync,
+                    task["request_data"]
+                )
             else:
                 service = BookingService()
                 # Ejecutar la reserva en un thread separado
-                return await self.loop.run_in_executor(
+                return await asyncio.get_running_loop().run_in_executor(
                     self.executor,
+                    self._run_in_task_context,
+                    task,
                     service.make_reservation_sync,  # Versión sincrónica del método
                     task["request_data"]
                 )
@@ -102,9 +520,42 @@ class QueueService:
             logging.error(f"Error executing task: {str(e)}")
             raise
 
-    async def add_task(self, request_type: str, request_data: dict) -> str:
-        """Agrega una nueva tarea a la cola"""
+    def _run_in_task_context(self, task, func, *args):
+        """
+        Ejecuta func en el thread del executor registrando sus fases en el desglose
+        de la tarea, reenviando su progreso a los suscriptores y acotando todas sus
+        esperas al presupuesto de tiempo de su tipo
+        """
+        task_id = task["task_id"]
+        def progress(event, data):
+            if event == "partial":
+                # Faltan pisos o combinaciones: el resultado no va al cache
+                task.setdefault("partial", []).append(data)
+            self._publish_progress(task_id, event, data)
+        budget = self.time_budgets.get(task["request_type"], 0)
+        deadline = Deadline(budget) if budget > 0 else None
+        with bind_timings(task.get("timings")), bind_progress(progress), bind_deadline(deadline):
+            return func(*args)
+
+    async def add_task(self, request_type: str, request_data: dict,
+                       on_progress: Optional[ProgressCallback] = None,
+                       priority: Optional[str] = None, deadline: Optional[float] = None) -> str:
+        """
+        Agrega una nueva tarea a la cola
+
+        Args:
+            on_progress: Callback (evento, datos) que recibe los lotes parciales de
+                la búsqueda ("batch") y el resultado final ("summary"). Se invoca
+                desde los threads de ejecución.
+            priority: Clase de prioridad ("booking", "search" o "prefetch"); por
+                defecto la que corresponde al tipo de tarea
+            deadline: Segundos desde ahora en los que la tarea debe empezar; si
+                vence en cola, la tarea falla sin ejecutarse
+        """
+        priority_class = priority_class_for(request_type, priority)
+        deadline_at = time.monotonic() + deadline if deadline is not None else None
         task_id = str(uuid.uuid4())
+        cached = self._cached_result({"request_type": request_type, "request_data": request_data})
         
         # Crear registro en BD
         db = SessionLocal()
@@ -115,17 +566,67 @@ class QueueService:
                 request_type=request_type,
                 request_data=request_data
             )
+            if cached:
+                # Responder desde el cache sin pasar por la cola
+                db_task.status = "COMPLETED"
+                db_task.result, db_task.result_fetched_at = cached
+                db_task.from_cache = True
+                db_task.completed_at = datetime.utcnow()
+            status = db_task.status
             db.add(db_task)
             db.commit()
         finally:
             db.close()
+        self._set_status([task_id], status)
+
+        if request_type == "search":
+            with self._inflight_lock:
+                self.coalescing_stats["searches"] += 1
+                if cached:
+                    if on_progress:
+                        on_progress("summary", {
+                            "task_id": task_id,
+                            "status": "COMPLETED",
+                            "result": cached[0],
+                            "result_fetched_at": cached[1].isoformat(),
+                            "from_cache": True
+                        })
+                    return task_id
+                # Con plazo la búsqueda corre sola: si venciera como líder fallarían todos
+                # sus seguidores, y como seguidora su plazo no se respetaría
+                key = self.cache.key_for(request_data) if deadline_at is None else None
+                subscribers = self._inflight.get(key) if key is not None else None
+                if subscribers:
+                    # Hay una búsqueda idéntica pendiente o en curso: compartir su ejecución
+                    subscribers.append(task_id)
+                    self._promote(subscribers[0], priority_class)
+                    if on_progress:
+                        self._subscribers.setdefault(subscribers[0], []).append((task_id, on_progress))
+                    self.coalescing_stats["coalesced"] += 1
+                    return task_id
+                if key is not None:
+                    self._inflight[key] = [task_id]
+                if on_progress:
+                    self._subscribers[task_id] = [(task_id, on_progress)]
+                self.coalescing_stats["executions"] += 1
+        else:
+            key = None
+            if on_progress:
+                with self._inflight_lock:
+                    self._subscribers[task_id] = [(task_id, on_progress)]
 
         # Agregar a la cola
-        self.task_queue.put({
+        task = {
             "task_id": task_id,
             "request_type": request_type,
-            "request_data": request_data
-        })
+            "request_data": request_data,
+            "coalesce_key": key,
+            "priority_class": priority_class,
+            "deadline": deadline_at,
+            "enqueued_at": time.monotonic()
+        }
+        self._queued[task_id] = task
+        self.task_queue.put(task)
         
         return task_id
 
@@ -146,7 +647,18 @@ class QueueService:
             
             if task.status == "COMPLETED":
                 response["result"] = task.result
-            elif task.status == "FAILED":
+                response["result_fetched_at"] = task.result_fetched_at.isoformat() if task.result_fetched_at else None
+                response["from_cache"] = bool(task.from_cache)
+                if task.result is None:
+                    # La retención ya borró el resultado
+                    response["result_purged"] = True
+            if task.timings:
+                response["timings"] = task.timings
+            if task.partial:
+                response["partial"] = task.partial
+            if task.coalesced_into:
+                response["coalesced_into"] = task.coalesced_into
+            if task.status == "FAILED":
                 response["error"] = task.error
                 
             return response
@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+from threading import local
+from typing import Callable, Optional
+import asyncio
+
+# Firma de los callbacks de progreso: (evento, datos)
+ProgressCallback = Callable[[str, dict], None]
+
+_current = local()
+
+def current_progress() -> Optional[ProgressCallback]:
+    """Retorna el callback de progreso de la tarea que se ejecuta en este thread"""
+    return getattr(_current, "callback", None)
+
+@contextmanager
+def bind_progress(callback: Optional[ProgressCallback]):
+    """Asocia un callback de progreso al thread actual (p. ej. threads auxiliares de una tarea)"""
+    previous = current_progress()
+    _current.callback = callback
+    try:
+        yield callback
+    finally:
+        _current.callback = previous
+
+def report_progress(event: str, data: dict):
+    """Publica un evento de progreso si la tarea actual tiene suscriptores"""
+    callback = current_progress()
+    if callback is not None:
+        callback(event, data)
+
+class ProgressStream:
+    """
+    Puente entre los threads de búsqueda y un endpoint asíncrono.
+
+    publish se puede llamar desde cualquier thread; los eventos se encolan en el
+    loop del endpoint, que los consume con next_event.
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop or asyncio.get_running_loop()
+        self.events: asyncio.Queue = asyncio.Queue()
+
+    def publish(self, event: str, data: dict):
+        try:
+            self.loop.call_soon_threadsafe(self.events.put_nowait, (event, data))
+        except RuntimeError:
+            # El loop del endpoint ya se cerró (el cliente se desconectó)
+            pass
+
+    async def next_event(self, timeout: Optional[float] = None):
+        """Retorna el siguiente (evento, datos); lanza asyncio.TimeoutError si no llega a tiempo"""
+        return await asyncio.wait_for(self.events.get(), timeout)
@@ -0,0 +1,257 @@
+from selenium import webdriver
+from threading import Lock
+from typing import Dict, List
+from config.settings import Settings
+from services.driver_factory import timed_get
+from services.timing_model import adaptive_wait
+from selenium.common.exceptions import TimeoutException
+import json
+import logging
+import os
+import time
+
+# Lee el localStorage de la página actual; las cookies salen de driver.get_cookies()
+LOCAL_STORAGE_SCRIPT = """
+var items = {};
+for (var i = 0; i < localStorage.length; i++) {
+    var key = localStorage.key(i);
+    items[key] = localStorage.getItem(key);
+}
+return JSON.stringify({origin: location.origin, items: items});
+"""
+
+# Validación barata de la sesión: estamos en el listado y no en el login
+SESSION_CHECK_SCRIPT = """
+return location.pathname.indexOf('booking.php') !== -1 && !!document.getElementById('floorId');
+"""
+
+# Se registra con Page.addScriptToEvaluateOnNewDocument: restaura el localStorage
+# guardado antes de que corran los scripts de la página, sin pisar valores existentes
+RESTORE_STORAGE_SCRIPT = """
+(function () {
+    if (location.origin !== %s) { return; }
+    var items = %s;
+    for (var key in items) {
+        if (localStorage.getItem(key) === null) { localStorage.setItem(key, items[key]); }
+    }
+})();
+"""
+
+class SessionStore:
+    """
+    Estado de la sesión de Skedway compartido entre navegadores y reinicios.
+
+    Guarda en un archivo JSON las cookies y el localStorage de un navegador con la
+    sesión abierta, más la marca de que el tour de bienvenida ya se cerró. Cada
+    navegador nuevo del pool arranca con ese estado (Network.setCookies y un
+    script que repone el localStorage), de modo que llega directo al listado sin
+    redirecciones ni popup.
+
+    Un perfil de Chrome (--user-data-dir) no puede ser usado por varios navegadores
+    a la vez, por eso el pool comparte el estado vía este archivo y no vía perfil.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # Solo inicializar una vez
+        if not self._initialized:
+            settings = Settings()
+            self.enabled = settings.session_persistence
+            self.path = os.path.expanduser(settings.session_state_file)
+            self.save_interval = settings.session_save_interval
+            self.check_wait = settings.session_check_wait
+            self.logger = logging.getLogger(__name__)
+            self._lock = Lock()
+            self._state = {"cookies": [], "local_storage": {}, "origin": None, "tour_dismissed": False, "saved_at": 0}
+            self._saved_monotonic = None
+            self.metrics = {"saves": 0, "restores": 0, "checks": 0, "expired": 0, "refreshes": 0, "refresh_failures": 0}
+            if self.enabled:
+                self._load()
+            self._initialized = True
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as state_file:
+                self._state.update(json.load(state_file))
+            self.logger.info(f"Sesión restaurada desde {self.path} ({len(self._state['cookies'])} cookies)")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"No se pudo leer el estado de sesión: {str(e)}")
+
+    def _write(self):
+        """
+        Escribe el estado de forma atómica (llamar con el lock tomado)
+
+        El archivo tiene cookies de sesión vigentes: solo lo puede leer el usuario
+        del proceso (0600, en un directorio 0700).
+        """
+        temporary = f"{self.path}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+            descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            # Un temporal previo pudo haber quedado con otros permisos
+            os.fchmod(descriptor, 0o600)
+            with os.fdopen(descriptor, "w", encoding="utf-8") as state_file:
+                json.dump(self._state, state_file)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            self.logger.warning(f"No se pudo guardar el estado de sesión: {str(e)}")
+
+    @property
+    def tour_dismissed(self) -> bool:
+        return self._state["tour_dismissed"]
+
+    def mark_tour_dismissed(self):
+        """Recuerda que el tour de bienvenida ya no aparece para esta cuenta"""
+        with self._lock:
+            if self._state["tour_dismissed"]:
+                return
+            self._state["tour_dismissed"] = True
+            if self.enabled:
+                self._write()
+
+    def cookies(self) -> List[Dict]:
+        """Cookies guardadas, en el formato de driver.get_cookies()"""
+        with self._lock:
+            return list(self._state["cookies"])
+
+    def install(self, driver: webdriver.Chrome):
+        """Carga el estado guardado en un navegador recién creado, antes de su primera navegación"""
+        if not self.enabled:
+            return
+        with self._lock:
+            cookies = list(self._state["cookies"])
+            origin, items = self._state["origin"], dict(self._state["local_storage"])
+        if not cookies and not items:
+            return
+        try:
+            self._set_cookies(driver, cookies)
+            if origin and items:
+                driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+                    "source": RESTORE_STORAGE_SCRIPT % (json.dumps(origin), json.dumps(items))
+                })
+            with self._lock:
+                self.metrics["restores"] += 1
+        except Exception as e:
+            self.logger.warning(f"No se pudo restaurar la sesión en el navegador: {str(e)}")
+
+    def _set_cookies(self, driver: webdriver.Chrome, cookies: List[Dict]):
+        """Network.setCookies no necesita estar en el dominio, a diferencia de add_cookie"""
+        if not cookies:
+            return
+        converted = []
+        for cookie in cookies:
+            item = {key: cookie[key] for key in ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite") if key in cookie}
+            if "expiry" in cookie:
+                item["expires"] = cookie["expiry"]
+            converted.append(item)
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": converted})
+
+    def is_valid(self, driver: webdriver.Chrome, wait: float = 0) -> bool:
+        """
+        El navegador está en el listado con la sesión abierta
+
+        Args:
+            wait: Segundos (tope adaptativo) que se le da a la página para renderizar
+                los filtros; con carga eager pueden no estar apenas vuelve driver.get
+        """
+        with self._lock:
+            self.metrics["checks"] += 1
+        check = lambda d: d.execute_script(SESSION_CHECK_SCRIPT)
+        try:
+            if wait <= 0:
+                return bool(check(driver))
+            # Opcional: una sesión vencida no es latencia de la página
+            adaptive_wait(driver, "session_check", wait, optional=True).until(check)
+            return True
+        except TimeoutException:
+            return False
+        except TimeoutError:
+            # Presupuesto de la tarea agotado
+            raise
+        except Exception:
+            return False
+
+    def ensure_valid(self, driver: webdriver.Chrome, url: str) -> bool:
+        """
+        Verifica la sesión después de cargar el listado; si expiró, la renueva una vez
+
+        Returns:
+            True si el navegador quedó en el listado con la sesión abierta
+        """
+        if self.is_valid(driver, wait=self.check_wait):
+            self.save(driver)
+            return True
+        with self._lock:
+            self.metrics["expired"] += 1
+        self.logger.warning("La sesión de Skedway expiró, renovándola")
+        return self.refresh(driver, url)
+
+    def refresh(self, driver: webdriver.Chrome, url: str) -> bool:
+        """
+        Repone las cookies guardadas (otro navegador pudo haberlas renovado) y recarga url
+
+        No hay credenciales en la aplicación: si el estado guardado también expiró,
+        la sesión debe volver a abrirse en Skedway.
+        """
+        with self._lock:
+            self.metrics["refreshes"] += 1
+        if self.enabled:
+            with self._lock:
+                self._load()
+                cookies = list(self._state["cookies"])
+            try:
+                self._set_cookies(driver, cookies)
+            except Exception as e:
+                self.logger.warning(f"No se pudieron reponer las cookies: {str(e)}")
+        timed_get(driver, url, "booking")
+        if self.is_valid(driver, wait=self.check_wait):
+            self.save(driver, force=True)
+            return True
+        with self._lock:
+            self.metrics["refresh_failures"] += 1
+        return False
+
+    def save(self, driver: webdriver.Chrome, force: bool = False):
+        """Guarda cookies y localStorage de un navegador con sesión válida, a lo sumo cada save_interval"""
+        if not self.enabled:
+            return
+        with self._lock:
+            recent = self._saved_monotonic is not None and time.monotonic() - self._saved_monotonic < self.save_interval
+        if recent and not force:
+            return
+        try:
+            cookies = driver.get_cookies()
+            storage = json.loads(driver.execute_script(LOCAL_STORAGE_SCRIPT))
+        except Exception as e:
+            self.logger.warning(f"No se pudo leer el estado de sesión del navegador: {str(e)}")
+            return
+        with self._lock:
+            self._state.update({
+                "cookies": cookies,
+                "local_storage": storage["items"],
+                "origin": storage["origin"],
+                "saved_at": time.time()
+            })
+            self._saved_monotonic = time.monotonic()
+            self.metrics["saves"] += 1
+            self._write()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.metrics,
+                "enabled": self.enabled,
+                "cookies": len(self._state["cookies"]),
+                "tour_dismissed": self._state["tour_dismissed"],
+                "saved_at": self._state["saved_at"]
+            }
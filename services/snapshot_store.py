@@ -0,0 +1,222 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from models.database import SessionLocal, AvailabilitySnapshot, FloorSnapshot
+from models.schemas import SearchRequest
+from config.settings import Settings
+import logging
+
+def _hhmm(value: Optional[str]) -> str:
+    """Normaliza un horario a HH:MM para poder compararlo como texto"""
+    if not value:
+        return ""
+    hours, minutes = value.split(":")[:2]
+    return f"{int(hours):02d}:{int(minutes):02d}"
+
+class SnapshotStore:
+    """
+    Snapshot persistente de los bloques libres por espacio, fecha y bloque de 30 minutos.
+
+    Cada piso guarda cuándo se refrescó y qué franja horaria cubrió. Las búsquedas
+    leen de la base los pisos vigentes y solo vuelven a scrapear los vencidos; al
+    refrescar un piso se escriben únicamente las filas que cambiaron.
+    """
+
+    def __init__(self):
+        settings = Settings()
+        self.enabled = settings.snapshot_enabled
+        self.ttl = timedelta(seconds=settings.snapshot_ttl)
+        self.logger = logging.getLogger(__name__)
+
+    def _filters(self, model, request: SearchRequest) -> list:
+        return [
+            model.booking_type == request.booking_type,
+            model.building == request.building,
+            model.date == request.date
+        ]
+
+    def _covers(self, floor: FloorSnapshot, request: SearchRequest, now: datetime) -> bool:
+        """Un piso está vigente si se refrescó dentro del TTL y cubre la franja pedida"""
+        if floor.refreshed_at is None or now - floor.refreshed_at > self.ttl:
+            return False
+        return floor.window_start <= _hhmm(request.start_time) and floor.window_end >= _hhmm(request.end_time)
+
+    def register_floors(self, request: SearchRequest, floors: Iterable[str]):
+        """Registra los pisos existentes para saber cuándo el snapshot está completo"""
+        if not self.enabled:
+            return
+        db = SessionLocal()
+        try:
+            known = {
+                row.floor for row in
+                db.query(FloorSnapshot.floor).filter(*self._filters(FloorSnapshot, request))
+            }
+            for floor in floors:
+                if floor not in known:
+                    db.add(FloorSnapshot(
+                        booking_type=request.booking_type,
+                        building=request.building,
+                        date=request.date,
+                        floor=floor
+                    ))
+            db.commit()
+        finally:
+            db.close()
+
+    def fresh_floors(self, request: SearchRequest) -> Set[str]:
+        """Pisos cuyo snapshot puede responder la búsqueda sin scrapear"""
+        if not self.enabled:
+            return set()
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            rows = db.query(FloorSnapshot).filter(*self._filters(FloorSnapshot, request)).all()
+            return {row.floor for row in rows if self._covers(row, request, now)}
+        finally:
+            db.close()
+
+    def all_floors_fresh(self, request: SearchRequest) -> bool:
+        """Si todos los pisos conocidos están vigentes, la búsqueda se responde desde la base"""
+        if not self.enabled:
+            return False
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            rows = db.query(FloorSnapshot).filter(*self._filters(FloorSnapshot, request)).all()
+            return bool(rows) and all(self._covers(row, request, now) for row in rows)
+        finally:
+            db.close()
+
+    def load_spaces(self, request: SearchRequest,
+                    floors: Optional[Iterable[str]] = None) -> List[Tuple[str, int, List[Dict]]]:
+        """
+        Lee los bloques libres dentro de la franja pedida
+
+        Returns:
+            Lista de (piso, página, espacios crudos) en el mismo formato que el scrape
+        """
+        if not self.enabled:
+            return []
+        db = SessionLocal()
+        try:
+            query = db.query(AvailabilitySnapshot).filter(
+                *self._filters(AvailabilitySnapshot, request),
+                AvailabilitySnapshot.block_start >= _hhmm(request.start_time),
+                AvailabilitySnapshot.block_end <= _hhmm(request.end_time)
+            )
+            if floors is not None:
+                query = query.filter(AvailabilitySnapshot.floor.in_(list(floors)))
+            rows = query.order_by(
+                AvailabilitySnapshot.floor,
+                AvailabilitySnapshot.page,
+                AvailabilitySnapshot.space_id,
+                AvailabilitySnapshot.block_start
+            ).all()
+        finally:
+            db.close()
+
+        pages: Dict[Tuple[str, int], Dict[str, Dict]] = {}
+        for row in rows:
+            spaces = pages.setdefault((row.floor, row.page), {})
+            space = spaces.setdefault(row.space_id, {"id": row.space_id, "name": row.space_name, "blocks": []})
+            space["blocks"].append([row.block_start, row.block_end])
+        return [(floor, page, list(spaces.values())) for (floor, page), spaces in pages.items()]
+
+    def save_floor(self, request: SearchRequest, floor: str, pages: List[Tuple[int, List[Dict]]]):
+        """
+        Refresca el snapshot de un piso escribiendo solo las filas que cambiaron
+
+        Args:
+            pages: Lista de (página, espacios crudos) obtenida del scrape del piso
+        """
+        if not self.enabled:
+            return
+        window_start, window_end = _hhmm(request.start_time), _hhmm(request.end_time)
+
+        scraped: Dict[Tuple[str, str], Tuple[str, str, int]] = {}
+        for page, raw_spaces in pages:
+            for raw in raw_spaces:
+                for block_start, block_end in raw.get("blocks") or []:
+                    if not block_start or not block_end:
+                        continue
+                    block_start, block_end = _hhmm(block_start), _hhmm(block_end)
+                    if block_start < window_start or block_end > window_end:
+                        continue
+                    scraped.setdefault((raw.get("id"), block_start), (block_end, raw.get("name"), page))
+
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            existing = {
+                (row.space_id, row.block_start): row for row in
+                db.query(AvailabilitySnapshot).filter(
+                    *self._filters(AvailabilitySnapshot, request),
+                    AvailabilitySnapshot.floor == floor,
+                    AvailabilitySnapshot.block_start >= window_start,
+                    AvailabilitySnapshot.block_end <= window_end
+                )
+            }
+
+            removed = [row for key, row in existing.items() if key not in scraped]
+            for row in removed:
+                db.delete(row)
+
+            added = updated = 0
+            for (space_id, block_start), (block_end, space_name, page) in scraped.items():
+                row = existing.get((space_id, block_start))
+                if row is None:
+                    db.add(AvailabilitySnapshot(
+                        booking_type=request.booking_type,
+                        building=request.building,
+                        date=request.date,
+                        floor=floor,
+                        space_id=space_id,
+                        space_name=space_name,
+                        page=page,
+                        block_start=block_start,
+                        block_end=block_end,
+                        scraped_at=now
+                    ))
+                    added += 1
+                elif (row.block_end, row.space_name, row.page) != (block_end, space_name, page):
+                    row.block_end, row.space_name, row.page = block_end, space_name, page
+                    row.scraped_at = now
+                    updated += 1
+
+            floor_row = db.query(FloorSnapshot).filter(
+                *self._filters(FloorSnapshot, request),
+                FloorSnapshot.floor == floor
+            ).first()
+            if floor_row is None:
+                floor_row = FloorSnapshot(
+                    booking_type=request.booking_type,
+                    building=request.building,
+                    date=request.date,
+                    floor=floor
+                )
+                db.add(floor_row)
+            floor_row.window_start = window_start
+            floor_row.window_end = window_end
+            floor_row.refreshed_at = now
+
+            db.commit()
+            self.logger.info(
+                f"Snapshot de {floor} ({request.date}): {added} nuevas, {updated} actualizadas, {len(removed)} eliminadas"
+            )
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def invalidate(self, date: str):
+        """Marca como vencidos todos los pisos de una fecha para forzar su refresco"""
+        if not self.enabled:
+            return
+        db = SessionLocal()
+        try:
+            db.query(FloorSnapshot).filter(FloorSnapshot.date == date).update(
+                {"refreshed_at": None}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
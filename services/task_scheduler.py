@@ -0,0 +1,87 @@
+from queue import Queue
+from typing import Dict, Optional
+import itertools
+import time
+
+# Clases de prioridad: menor valor, mayor prioridad
+PRIORITY_CLASSES = {"booking": 0, "search": 1, "prefetch": 2}
+DEFAULT_CLASS = {
+    "booking": "booking",
+    "booking_batch": "booking",
+    "search_and_book": "booking",
+    "search": "search"
+}
+# Clases que un cliente puede pedir por tipo de tarea: una búsqueda no puede pasar delante de las reservas
+ALLOWED_CLASSES = {
+    "search": ("search", "prefetch")
+}
+
+class PriorityTaskQueue(Queue):
+    """
+    Cola de tareas con prioridad por clase, plazos y envejecimiento.
+
+    Mantiene la interfaz de queue.Queue (get con timeout, task_done,
+    all_tasks_done) para que los trabajadores la usen igual que la FIFO. Al
+    despachar se elige la tarea con menor prioridad efectiva:
+
+    - la prioridad base de su clase (booking > search > prefetch),
+    - menos un nivel por cada aging_seconds de espera, para que ninguna clase
+      quede postergada indefinidamente,
+    - las tareas cuyo plazo vence dentro de deadline_horizon segundos pasan
+      adelante de todas, ordenadas por plazo.
+
+    Los empates se resuelven por orden de llegada. El centinela None de apagado
+    se despacha antes que cualquier tarea.
+    """
+
+    def __init__(self, aging_seconds: float = 30, deadline_horizon: float = 30):
+        self.aging_seconds = aging_seconds
+        self.deadline_horizon = deadline_horizon
+        super().__init__()
+
+    def _init(self, maxsize):
+        self.queue = []
+        self._sequence = itertools.count()
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, item):
+        self.queue.append((next(self._sequence), item))
+
+    def _get(self):
+        now = time.monotonic()
+        best_index = min(range(len(self.queue)), key=lambda index: self._sort_key(self.queue[index], now))
+        return self.queue.pop(best_index)[1]
+
+    def _sort_key(self, entry, now: float) -> tuple:
+        sequence, task = entry
+        if task is None:
+            return (float("-inf"), 0, sequence)
+        deadline = task.get("deadline")
+        if deadline is not None and deadline - now <= self.deadline_horizon:
+            return (float("-inf"), deadline, sequence)
+        priority = PRIORITY_CLASSES.get(task.get("priority_class"), PRIORITY_CLASSES["search"])
+        if self.aging_seconds > 0:
+            priority -= (now - task.get("enqueued_at", now)) / self.aging_seconds
+        return (priority, deadline if deadline is not None else float("inf"), sequence)
+
+    def depth_by_class(self) -> Dict[str, int]:
+        """Tareas en cola por clase de prioridad"""
+        depth = {name: 0 for name in PRIORITY_CLASSES}
+        with self.mutex:
+            for _, task in self.queue:
+                if task is not None:
+                    depth[task.get("priority_class", "search")] += 1
+        return depth
+
+def priority_class_for(request_type: str, priority: Optional[str] = None) -> str:
+    """Clase de prioridad de una tarea: la indicada o la que corresponde a su tipo"""
+    if priority is None:
+        return DEFAULT_CLASS.get(request_type, "search")
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"Clase de prioridad desconocida: {priority}")
+    allowed = ALLOWED_CLASSES.get(request_type, tuple(PRIORITY_CLASSES))
+    if priority not in allowed:
+        raise ValueError(f"Clase de prioridad no permitida para {request_type}: {priority} (usar {', '.join(allowed)})")
+    return priority
@@ -0,0 +1,217 @@
+from datetime import datetime, timedelta
+from queue import Queue, Empty
+from threading import Event, Lock, Thread
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy import null
+from models.database import Task, SessionLocal
+from config.settings import Settings
+import logging
+import time
+
+# Cambios a aplicar: lista de (task_ids, valores)
+TaskUpdates = List[Tuple[List[str], dict]]
+# Recibe True si los cambios quedaron confirmados, False si el lote falló en todos los intentos
+CommitCallback = Callable[[bool], None]
+
+class TaskStore:
+    """
+    Escritura por lotes de las transiciones de estado de las tareas y retención.
+
+    Las transiciones (PROCESSING, COMPLETED, FAILED) se encolan y un thread las
+    aplica agrupadas en una sola transacción cada task_write_batch_interval
+    segundos. Un lote que falla (p. ej. "database is locked") se reintenta con
+    backoff hasta task_write_attempts veces. Cada escritura puede llevar un
+    callback que se invoca con True recién cuando su lote quedó confirmado en la
+    base, o con False si no se pudo escribir.
+
+    Otro thread borra periódicamente el JSON de resultado de las tareas viejas y
+    elimina las tareas terminadas que superan el período de retención.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # Solo inicializar una vez
+        if not self._initialized:
+            settings = Settings()
+            self.batch_interval = settings.task_write_batch_interval
+            self.batch_size = max(1, settings.task_write_batch_size)
+            self.write_attempts = max(1, settings.task_write_attempts)
+            self.result_retention = timedelta(hours=settings.task_result_retention_hours)
+            self.task_retention = timedelta(days=settings.task_retention_days)
+            self.retention_interval = settings.task_retention_interval
+            self.logger = logging.getLogger(__name__)
+            self._pending = Queue()
+            self._stop = Event()
+            self._stats_lock = Lock()
+            self.metrics = {
+                "batches": 0,
+                "writes": 0,
+                "write_errors": 0,
+                "write_retries": 0,
+                "batches_lost": 0,
+                "write_seconds_total": 0.0,
+                "write_seconds_max": 0.0,
+                "results_purged": 0,
+                "tasks_purged": 0
+            }
+            self._writer = Thread(target=self._write_loop, name="task-store-writer", daemon=True)
+            self._writer.start()
+            self._retention = Thread(target=self._retention_loop, name="task-store-retention", daemon=True)
+            self._retention.start()
+            self._initialized = True
+
+    def write(self, updates: TaskUpdates, on_commit: Optional[CommitCallback] = None):
+        """
+        Encola cambios sobre tareas existentes
+
+        Args:
+            updates: Lista de (task_ids, valores); se aplican en orden
+            on_commit: Se invoca desde el thread escritor con True cuando los cambios
+                están confirmados, o con False si no se pudieron escribir
+        """
+        self._pending.put((updates, on_commit))
+
+    def update(self, task_ids: List[str], values: dict, on_commit: Optional[CommitCallback] = None):
+        """Encola los mismos cambios para varias tareas"""
+        self.write([(task_ids, values)], on_commit)
+
+    def _write_loop(self):
+        """Thread escritor: junta las escrituras que llegan en una ventana y las confirma juntas"""
+        stopping = False
+        while not stopping:
+            item = self._pending.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.batch_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._pending.get(timeout=remaining)
+                except Empty:
+                    break
+                if item is None:
+                    # Señal de cierre: escribir lo acumulado antes de salir
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[Tuple[TaskUpdates, Optional[CommitCallback]]]):
+        started = time.monotonic()
+        committed = False
+        for attempt in range(self.write_attempts):
+            if attempt:
+                with self._stats_lock:
+                    self.metrics["write_retries"] += 1
+                time.sleep(min(2.0, 0.1 * 2 ** attempt))
+            if self._apply(batch):
+                committed = True
+                break
+
+        elapsed = time.monotonic() - started
+        with self._stats_lock:
+            self.metrics["batches"] += 1
+            self.metrics["writes"] += len(batch)
+            self.metrics["batches_lost"] += int(not committed)
+            self.metrics["write_seconds_total"] += elapsed
+            self.metrics["write_seconds_max"] = max(self.metrics["write_seconds_max"], elapsed)
+        if not committed:
+            self.logger.error(f"Lote de {len(batch)} transiciones descartado tras {self.write_attempts} intentos")
+
+        # Avisar siempre, para no dejar clientes esperando; el callback sabe si se confirmó
+        for _, on_commit in batch:
+            if on_commit is None:
+                continue
+            try:
+                on_commit(committed)
+            except Exception as e:
+                self.logger.warning(f"Error en callback de escritura: {str(e)}")
+
+    def _apply(self, batch: List[Tuple[TaskUpdates, Optional[CommitCallback]]]) -> bool:
+        """Aplica el lote en una transacción; retorna False si hubo que hacer rollback"""
+        db = SessionLocal()
+        try:
+            for updates, _ in batch:
+                for task_ids, values in updates:
+                    if not task_ids:
+                        continue
+                    updated = db.query(Task).filter(Task.task_id.in_(task_ids)).update(
+                        values, synchronize_session=False
+                    )
+                    if updated < len(task_ids):
+                        self.logger.warning(f"Tareas no encontradas al actualizar estado: {task_ids}")
+            db.commit()
+            return True
+        except Exception as e:
+            db.rollback()
+            with self._stats_lock:
+                self.metrics["write_errors"] += 1
+            self.logger.error(f"Error escribiendo lote de {len(batch)} transiciones: {str(e)}")
+            return False
+        finally:
+            db.close()
+
+    def _retention_loop(self):
+        while not self._stop.wait(self.retention_interval):
+            try:
+                self.purge()
+            except Exception as e:
+                self.logger.error(f"Error en la retención de tareas: {str(e)}")
+
+    def purge(self, now: Optional[datetime] = None) -> dict:
+        """
+        Aplica la política de retención
+
+        Returns:
+            Cantidad de resultados borrados y de tareas eliminadas
+        """
+        now = now or datetime.utcnow()
+        results = tasks = 0
+        db = SessionLocal()
+        try:
+            if self.result_retention.total_seconds() > 0:
+                results = db.query(Task).filter(
+                    Task.completed_at < now - self.result_retention,
+                    Task.result.isnot(None)
+                ).update({"result": null(), "timings": null()}, synchronize_session=False)
+            if self.task_retention.total_seconds() > 0:
+                tasks = db.query(Task).filter(
+                    Task.completed_at < now - self.task_retention,
+                    Task.status.in_(("COMPLETED", "FAILED"))
+                ).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        with self._stats_lock:
+            self.metrics["results_purged"] += results
+            self.metrics["tasks_purged"] += tasks
+        if results or tasks:
+            self.logger.info(f"Retención: {results} resultados borrados, {tasks} tareas eliminadas")
+        return {"results_purged": results, "tasks_purged": tasks}
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.metrics)
+        stats["write_seconds_avg"] = stats["write_seconds_total"] / stats["batches"] if stats["batches"] else 0.0
+        stats["writes_per_batch"] = stats["writes"] / stats["batches"] if stats["batches"] else 0.0
+        stats["pending"] = self._pending.qsize()
+        return stats
+
+    def close(self, timeout: Optional[float] = None):
+        """Escribe las transiciones pendientes y detiene los threads"""
+        self._stop.set()
+        self._pending.put(None)
+        self._writer.join(timeout)
@@ -0,0 +1,181 @@
+from selenium import webdriver
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+from collections import deque
+from contextlib import contextmanager
+from threading import Lock, local
+from typing import Callable, Dict, Optional
+from config.settings import Settings
+import random
+import time
+
+class TimingModel:
+    """
+    Latencias observadas por paso (esperas del DOM, cargas de página) y timeouts
+    derivados de ellas.
+
+    Guarda las últimas timing_window latencias de cada paso. Con al menos
+    timeout_min_samples muestras, el timeout del paso es el percentil
+    timeout_percentile multiplicado por timeout_multiplier, acotado entre
+    timeout_min_seconds y timeout_max_seconds; antes se usa el timeout fijo del
+    paso. Una espera que vence se registra con el timeout usado, así que si el
+    sitio se vuelve más lento el timeout crece en las esperas siguientes.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # Solo inicializar una vez
+        if not self._initialized:
+            settings = Settings()
+            self.enabled = settings.adaptive_timeouts
+            self.percentile_rank = settings.timeout_percentile
+            self.multiplier = settings.timeout_multiplier
+            self.min_seconds = settings.timeout_min_seconds
+            self.max_seconds = settings.timeout_max_seconds
+            self.min_samples = settings.timeout_min_samples
+            self.window = max(1, settings.timing_window)
+            self.page_load_timeout = settings.chrome_page_load_timeout
+            self.backoff_base = settings.retry_backoff_base
+            self.backoff_max = settings.retry_backoff_max
+            self._samples: Dict[str, deque] = {}
+            self._timeouts: Dict[str, int] = {}
+            self._lock = Lock()
+            self._initialized = True
+
+    def observe(self, step: str, seconds: float, timed_out: bool = False):
+        with self._lock:
+            samples = self._samples.get(step)
+            if samples is None:
+                samples = self._samples[step] = deque(maxlen=self.window)
+            samples.append(seconds)
+            if timed_out:
+                self._timeouts[step] = self._timeouts.get(step, 0) + 1
+
+    def percentile(self, step: str, rank: float) -> Optional[float]:
+        """Percentil (0-1) de las latencias recientes del paso, o None sin muestras"""
+        with self._lock:
+            samples = sorted(self._samples.get(step, ()))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(rank * len(samples)))]
+
+    def timeout(self, step: str, default: float) -> float:
+        """Timeout del paso según sus latencias observadas, o default si todavía no hay suficientes"""
+        if not self.enabled:
+            return default
+        with self._lock:
+            count = len(self._samples.get(step, ()))
+        if count < self.min_samples:
+            return default
+        value = self.percentile(step, self.percentile_rank) * self.multiplier
+        return min(self.max_seconds, max(self.min_seconds, value))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            steps = list(self._samples)
+        return {
+            step: {
+                "samples": len(self._samples[step]),
+                "timeouts": self._timeouts.get(step, 0),
+                "p50": self.percentile(step, 0.5),
+                "p99": self.percentile(step, 0.99),
+                "timeout": self.timeout(step, 0.0)
+            }
+            for step in steps
+        }
+
+class Deadline:
+    """Presupuesto de tiempo de una tarea, compartido por todas sus esperas y reintentos"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def check(self, step: str):
+        if self.remaining() <= 0:
+            raise TimeoutError(f"Se agotó el presupuesto de {self.seconds:.0f}s de la tarea en '{step}'")
+
+_current = local()
+
+def current_deadline() -> Optional[Deadline]:
+    """Retorna el presupuesto de la tarea que se ejecuta en este thread"""
+    return getattr(_current, "deadline", None)
+
+@contextmanager
+def bind_deadline(deadline: Optional[Deadline]):
+    """Asocia un presupuesto al thread actual (p. ej. threads auxiliares de una tarea)"""
+    previous = current_deadline()
+    _current.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _current.deadline = previous
+
+def wait_timeout(step: str, default: float) -> float:
+    """
+    Timeout de un paso: el del modelo, recortado a lo que queda del presupuesto de la tarea
+
+    Raises:
+        TimeoutError: Si el presupuesto ya se agotó
+    """
+    timeout = TimingModel().timeout(step, default)
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check(step)
+        timeout = min(timeout, deadline.remaining())
+    return timeout
+
+def retry_delay(attempt: int) -> Optional[float]:
+    """
+    Espera antes del reintento attempt (desde 0): backoff exponencial con jitter completo
+
+    Returns:
+        Segundos a esperar, o None si el presupuesto de la tarea no alcanza para otro intento
+    """
+    model = TimingModel()
+    delay = random.uniform(0, min(model.backoff_max, model.backoff_base * 2 ** attempt))
+    deadline = current_deadline()
+    if deadline is not None and deadline.remaining() <= delay:
+        return None
+    return delay
+
+class AdaptiveWait:
+    """WebDriverWait con el timeout del paso que registra cuánto tardó la condición"""
+
+    def __init__(self, driver: webdriver.Chrome, step: str, default: float, optional: bool = False):
+        self.driver = driver
+        self.step = step
+        self.default = default
+        # Elementos que pueden no aparecer (p. ej. el popup): su ausencia no es latencia
+        self.optional = optional
+
+    def _run(self, method: str, condition: Callable):
+        timeout = wait_timeout(self.step, self.default)
+        started = time.monotonic()
+        try:
+            result = getattr(WebDriverWait(self.driver, timeout), method)(condition)
+        except TimeoutException:
+            if not self.optional:
+                TimingModel().observe(self.step, timeout, timed_out=True)
+            raise
+        TimingModel().observe(self.step, time.monotonic() - started)
+        return result
+
+    def until(self, condition: Callable):
+        return self._run("until", condition)
+
+    def until_not(self, condition: Callable):
+        return self._run("until_not", condition)
+
+def adaptive_wait(driver: webdriver.Chrome, step: str, default: float, optional: bool = False) -> AdaptiveWait:
+    """Reemplazo de WebDriverWait(driver, default) con timeout aprendido para step"""
+    return AdaptiveWait(driver, step, default, optional)
@@ -0,0 +1,222 @@
+from selenium import webdriver
+from threading import Lock
+from services.page_waits import PageWaiter
+from typing import Dict, Iterable, List, Optional
+import base64
+import json
+import logging
+import re
+
+# Claves con las que se reconocen los campos de un espacio y de sus bloques en el JSON
+ID_KEYS = ("spaceId", "space_id", "id")
+NAME_KEYS = ("spaceName", "space_name", "name", "title")
+BLOCK_LIST_KEYS = ("blocks", "slots", "timeBlocks", "time_blocks", "schedule", "availability")
+START_KEYS = ("timeStart", "time_start", "startTime", "start_time", "start", "from")
+END_KEYS = ("timeEnd", "time_end", "endTime", "end_time", "end", "to")
+FREE_KEYS = ("free", "available", "isFree", "is_free", "isAvailable")
+STATUS_KEYS = ("status", "state", "type")
+FREE_STATUSES = ("free", "available", "libre", "disponible")
+
+TIME_PATTERN = re.compile(r"(\d{1,2}):(\d{2})")
+
+class CaptureStats:
+    """Cuántas páginas se resolvieron desde las respuestas XHR y cuántas cayeron al DOM"""
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # Solo inicializar una vez
+        if not self._initialized:
+            self._lock = Lock()
+            self.metrics = {
+                "pages_captured": 0,
+                "pages_fallback": 0,
+                "responses_read": 0,
+                "responses_failed": 0,
+                "responses_ambiguous": 0
+            }
+            self._initialized = True
+
+    def record(self, key: str, count: int = 1):
+        with self._lock:
+            self.metrics[key] += count
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.metrics)
+
+def _first(data: dict, keys: Iterable[str]):
+    for key in keys:
+        if key in data and data[key] not in (None, ""):
+            return data[key]
+    return None
+
+def _hhmm(value) -> Optional[str]:
+    """Extrae HH:MM de un horario o fecha-hora ("9:00", "09:00:00", "2024-05-02T09:00:00")"""
+    if not isinstance(value, str):
+        return None
+    match = TIME_PATTERN.search(value.split("T")[-1])
+    if not match:
+        return None
+    return f"{int(match.group(1)):02d}:{match.group(2)}"
+
+class AmbiguousPayload(Exception):
+    """El JSON tiene espacios, pero sus bloques no indican si están libres"""
+
+def _is_free(block: dict) -> bool:
+    flag = _first(block, FREE_KEYS)
+    if flag is not None:
+        return bool(flag)
+    status = _first(block, STATUS_KEYS)
+    if isinstance(status, str):
+        return status.lower() in FREE_STATUSES
+    # Sin indicador no se sabe si la lista es de bloques libres o de todos los bloques
+    raise AmbiguousPayload(f"Bloque sin indicador de disponibilidad: {sorted(block)}")
+
+def _space_from(data: dict) -> Optional[Dict]:
+    """
+    Convierte un objeto JSON en un espacio crudo si tiene la forma de uno
+
+    Raises:
+        AmbiguousPayload: Si algún bloque no indica si está libre
+    """
+    space_id = _first(data, ID_KEYS)
+    name = _first(data, NAME_KEYS)
+    blocks = _first(data, BLOCK_LIST_KEYS)
+    if space_id is None or not isinstance(name, str) or not isinstance(blocks, list):
+        return None
+    free_blocks = []
+    for block in blocks:
+        if not isinstance(block, dict) or not _is_free(block):
+            continue
+        start, end = _hhmm(_first(block, START_KEYS)), _hhmm(_first(block, END_KEYS))
+        if start and end:
+            free_blocks.append([start, end])
+    return {"id": str(space_id), "name": name, "blocks": free_blocks}
+
+def parse_spaces(payload) -> List[Dict]:
+    """
+    Busca espacios en un JSON de forma tolerante
+
+    Recorre el documento completo y convierte cada objeto con id, nombre y una
+    lista de bloques en {"id", "name", "blocks": [[inicio, fin], ...]}, el mismo
+    formato que SPACES_EXTRACTION_SCRIPT.
+
+    Raises:
+        AmbiguousPayload: Si algún bloque no indica si está libre; el llamador
+            debe leer la página desde el DOM
+    """
+    spaces = []
+    pending = [payload]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, dict):
+            space = _space_from(node)
+            if space is not None:
+                spaces.append(space)
+                continue
+            pending.extend(node.values())
+        elif isinstance(node, list):
+            pending.extend(reversed(node))
+    return spaces
+
+class XhrCapture:
+    """
+    Lee las respuestas JSON que la página pide en segundo plano desde los logs
+    de performance de Chrome (requiere goog:loggingPrefs performance, ver
+    DriverFactory) y obtiene su cuerpo con Network.getResponseBody de DevTools.
+    """
+
+    def __init__(self, driver: webdriver.Chrome, url_patterns: Iterable[str], wait: float = 2):
+        self.driver = driver
+        self.url_patterns = [pattern.lower() for pattern in url_patterns]
+        self.wait = wait
+        self.stats = CaptureStats()
+        self.logger = logging.getLogger(__name__)
+        self._candidates: List[str] = []
+        self._finished = set()
+
+    def reset(self):
+        """Descarta los eventos acumulados; llamar antes de la acción que dispara el XHR"""
+        self._candidates, self._finished = [], set()
+        try:
+            self.driver.get_log("performance")
+        except Exception as e:
+            self.logger.debug(f"No se pudieron leer los logs de performance: {str(e)}")
+
+    def _responses_finished(self) -> bool:
+        """Lee los eventos nuevos; True si hay respuestas JSON candidatas y todas terminaron de cargar"""
+        self._collect()
+        return bool(self._candidates) and all(request_id in self._finished for request_id in self._candidates)
+
+    def _json_responses(self) -> List[str]:
+        """
+        requestId de las respuestas JSON terminadas desde el último reset
+
+        Con carga eager el XHR puede seguir en curso cuando vuelve driver.get: se
+        espera a que termine, con un tope, antes de caer al DOM.
+        """
+        if self.wait > 0:
+            PageWaiter(self.driver).wait("xhr_response", lambda d: self._responses_finished(), self.wait)
+        else:
+            self._collect()
+        return [request_id for request_id in self._candidates if request_id in self._finished]
+
+    def _collect(self):
+        """Acumula los eventos de red del log de performance (get_log los consume)"""
+        for entry in self.driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method, params = message.get("method"), message.get("params", {})
+            if method == "Network.responseReceived":
+                response = params.get("response", {})
+                url = response.get("url", "").lower()
+                if "json" in response.get("mimeType", "") and any(pattern in url for pattern in self.url_patterns):
+                    self._candidates.append(params.get("requestId"))
+            elif method == "Network.loadingFinished":
+                self._finished.add(params.get("requestId"))
+
+    def spaces(self) -> Optional[List[Dict]]:
+        """
+        Espacios de las respuestas capturadas desde el último reset
+
+        Returns:
+            Lista de espacios crudos, o None si no hubo una respuesta reconocible
+            (el llamador usa la extracción del DOM)
+        """
+        try:
+            request_ids = self._json_responses()
+        except Exception as e:
+            self.logger.debug(f"Captura XHR no disponible: {str(e)}")
+            return None
+
+        spaces, recognized = [], False
+        for request_id in request_ids:
+            try:
+                body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+                text = body.get("body") or "null"
+                if body.get("base64Encoded"):
+                    text = base64.b64decode(text).decode("utf-8", errors="replace")
+                payload = json.loads(text)
+            except Exception:
+                self.stats.record("responses_failed")
+                continue
+            self.stats.record("responses_read")
+            try:
+                parsed = parse_spaces(payload)
+            except AmbiguousPayload as e:
+                # No adivinar: toda la página se lee desde el DOM
+                self.stats.record("responses_ambiguous")
+                self.logger.debug(f"Respuesta XHR ambigua: {str(e)}")
+                return None
+            if parsed:
+                recognized = True
+                spaces.extend(parsed)
+        return spaces if recognized else None
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# Los módulos de la aplicación se importan desde la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# models.database crea el engine al importarse: usar una base temporal, no la del checkout
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tests.db')}")
+os.environ.setdefault("SESSION_PERSISTENCE", "false")
@@ -0,0 +1,60 @@
+import logging
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("selenium")
+
+from services.booking_service import BookingService
+
+ITEM = {"title": "Reserva", "space_id": "5001", "date": "20/10/2026", "start_time": "09:00", "end_time": "18:00"}
+
+class RecordingPool:
+    """Pool de un solo navegador que registra el orden de los préstamos"""
+
+    def __init__(self):
+        self.events = []
+        self.free = 1
+
+    @contextmanager
+    def driver(self, timeout=None):
+        self.events.append(("driver", timeout))
+        assert self.free, "la sesión principal esperó un navegador"
+        self.free -= 1
+        try:
+            yield "main"
+        finally:
+            self.free += 1
+
+    def acquire(self, timeout=None):
+        self.events.append(("acquire", timeout))
+        if not self.free:
+            raise TimeoutError("No hay navegadores disponibles en el pool")
+        raise AssertionError("no debería quedar un navegador libre")
+
+@pytest.fixture
+def service():
+    service = BookingService.__new__(BookingService)
+    service.logger = logging.getLogger("tests")
+    service.pool = RecordingPool()
+    service.batch_max_sessions = 3
+    service.batch_max_items = 10
+    sessions = []
+    def run_session(driver, pending, results):
+        sessions.append(driver)
+        while not pending.empty():
+            index, item = pending.get_nowait()
+            results[index] = {"index": index, "space_id": item.space_id, "status": "success"}
+    service._run_batch_session = run_session
+    service._invalidate_availability = lambda dates: None
+    service.sessions = sessions
+    return service
+
+def test_main_session_is_checked_out_before_helpers(service):
+    result = service.make_reservations_batch_sync({"items": [ITEM, ITEM, ITEM], "sessions": 3})
+    assert result["succeeded"] == 3
+    assert service.pool.events[0] == ("driver", None)
+    # Las auxiliares no esperan (y no arrancan si la cola ya se vació): con el pool
+    # ocupado el principal hace todo el lote
+    assert all(event == ("acquire", 0) for event in service.pool.events[1:])
+    assert service.sessions == ["main"]
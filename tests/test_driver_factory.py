@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip("selenium")
+
+from services.driver_factory import open_tab
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def new_window(self, kind):
+        self.driver.handles.append(f"tab-{len(self.driver.handles)}")
+        self.driver.current_window_handle = self.driver.handles[-1]
+
+class FakeDriver:
+    """Registra en qué pestaña se ejecuta cada comando de DevTools"""
+
+    def __init__(self):
+        self.handles = ["tab-0"]
+        self.current_window_handle = "tab-0"
+        self.switch_to = FakeSwitchTo(self)
+        self.cdp = []
+
+    def execute_cdp_cmd(self, command, params):
+        self.cdp.append((self.current_window_handle, command))
+
+def test_new_tab_gets_the_blocked_urls():
+    driver = FakeDriver()
+    handle = open_tab(driver)
+    assert handle == "tab-1"
+    assert driver.cdp == [("tab-1", "Network.enable"), ("tab-1", "Network.setBlockedURLs")]
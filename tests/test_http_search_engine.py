@@ -0,0 +1,96 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from models.schemas import SearchRequest
+from services.http_search_engine import HttpSearchEngine
+
+# La sesión se inicializa desde SessionStore, que importa selenium
+pytest.importorskip("selenium")
+
+from services.session_store import SessionStore
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "booking_listing.html")
+LOGIN_PAGE = b"<html><body><form id='login'><input name='email'></form></body></html>"
+REQUEST = SearchRequest(booking_type="parking", date="20/10/2026", building="Catalinas")
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """booking.php grabado: con la cookie de sesión vigente sirve el listado, si no el login"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.requests.append(parse_qs(url.query))
+        if url.path != "/booking.php":
+            self.send_error(404)
+            return
+        if f"PHPSESSID={self.server.session}" in (self.headers.get("Cookie") or ""):
+            with open(FIXTURE, "rb") as fixture:
+                body = fixture.read()
+        else:
+            body = LOGIN_PAGE
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.session = "valid"
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def engine(server, monkeypatch):
+    engine = HttpSearchEngine()
+    monkeypatch.setattr(engine, "base_url", f"http://127.0.0.1:{server.server_port}/booking.php")
+    monkeypatch.setattr(engine, "seed_from_browser", True)
+    engine.cookie_jar.clear()
+    yield engine
+    engine.cookie_jar.clear()
+
+def session_cookie(value: str) -> dict:
+    # Formato de driver.get_cookies()
+    return {"name": "PHPSESSID", "value": value, "domain": "127.0.0.1", "path": "/"}
+
+def test_fetch_listing_walks_floors_and_pages(server, engine, monkeypatch):
+    monkeypatch.setitem(SessionStore()._state, "cookies", [session_cookie("valid")])
+    listing = engine.fetch_listing(REQUEST, max_pages=3)
+
+    # Dos pisos; la paginación del fixture llega hasta la página 2
+    assert [(floor, page) for floor, page, _ in listing] == [
+        ("Subsuelo 1", 1), ("Subsuelo 1", 2), ("Subsuelo 2", 1), ("Subsuelo 2", 2)
+    ]
+    assert [space["id"] for space in listing[0][2]] == ["5001", "5002", "5003"]
+
+    # Landing, listado filtrado por sede y luego cada piso y página por URL
+    assert server.requests[0] == {"baseType": ["4"]}
+    assert server.requests[1]["companySiteId"] == ["12"]
+    assert [(query["floorId"], query["page"]) for query in server.requests[2:]] == [
+        (["101"], ["1"]), (["101"], ["2"]), (["102"], ["1"]), (["102"], ["2"])
+    ]
+
+def test_expired_session_is_reseeded_once(server, engine, monkeypatch):
+    engine.cookie_jar.set_cookie(engine._cookie_from_browser(session_cookie("expired")))
+    monkeypatch.setitem(SessionStore()._state, "cookies", [session_cookie("valid")])
+    listing = engine.fetch_listing(REQUEST, max_pages=1)
+    assert [(floor, page) for floor, page, _ in listing] == [("Subsuelo 1", 1), ("Subsuelo 2", 1)]
+    assert [cookie.value for cookie in engine.cookie_jar] == ["valid"]
+
+def test_session_that_cannot_be_renewed_fails(server, engine, monkeypatch):
+    monkeypatch.setitem(SessionStore()._state, "cookies", [session_cookie("expired")])
+    with pytest.raises(Exception, match="No se encontraron pisos"):
+        engine.fetch_listing(REQUEST, max_pages=1)
+    # Landing y listado filtrado, antes y después de reinicializar la sesión
+    assert len(server.requests) == 4
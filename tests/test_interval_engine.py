@@ -0,0 +1,35 @@
+from services.interval_engine import blocks_to_mask, longest_run, rank_masks, slot_index
+
+# Semántica de los tramos libres desde el motor de máscaras; difiere a propósito del
+# recorrido anterior de _analyze_page_spaces (ver tests/test_spaces_from_raw.py)
+
+def run_of(blocks):
+    start, length = longest_run(blocks_to_mask(blocks))
+    return start, length * 30
+
+def test_gap_of_thirty_minutes_breaks_the_run():
+    # El recorrido anterior unía los tramos y reportaba 90 minutos desde las 08:00
+    assert run_of([["08:00", "08:30"], ["08:30", "09:00"], ["09:30", "10:00"]]) == (slot_index("08:00"), 60)
+
+def test_block_order_does_not_matter():
+    # El recorrido anterior tomaba 15:00 -> 14:00 como consecutivos (60 minutos)
+    assert run_of([["15:00", "15:30"], ["14:00", "14:30"]]) == (slot_index("14:00"), 30)
+
+def test_long_block_counts_its_full_length():
+    # El recorrido anterior sumaba 30 minutos por bloque sin mirar su largo
+    assert run_of([["13:00", "17:00"]]) == (slot_index("13:00"), 240)
+
+def test_ties_keep_the_earliest_run():
+    assert run_of([["10:00", "11:00"], ["14:00", "15:00"]]) == (slot_index("10:00"), 60)
+
+def test_rank_masks_scores_within_the_requested_window():
+    masks = [
+        blocks_to_mask([["08:00", "10:00"]]),
+        blocks_to_mask([["08:00", "08:30"], ["09:00", "09:30"]]),
+        blocks_to_mask([["12:00", "18:00"]])
+    ]
+    ranking = rank_masks(masks, "08:00", "10:00")
+    assert ranking.order == [0, 1, 2]
+    assert ranking.run_lengths[0] == 4
+    assert ranking.scores[0] == 120.0
+    assert ranking.scores[2] == 0.0
@@ -0,0 +1,51 @@
+import os
+
+from services.http_search_engine import ListingParser
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "booking_listing.html")
+
+# Lo que SPACES_EXTRACTION_SCRIPT retorna sobre la misma página: primer h5 del
+# espacio con el texto normalizado y todos sus .block-free en orden
+EXPECTED_SPACES = [
+    {
+        "id": "5001",
+        "name": "favorite_border EHOBA-SS1-014 | Cochera",
+        "blocks": [["08:00", "08:30"], ["08:30", "09:00"], ["09:30", "10:00"]]
+    },
+    {"id": "5002", "name": "EHOBA-MOTO-03 | Moto", "blocks": [["08:00", "12:00"]]},
+    {"id": "5003", "name": "EHOBA-SS1-020 | Cochera", "blocks": []}
+]
+
+def parse_fixture() -> ListingParser:
+    parser = ListingParser()
+    with open(FIXTURE, encoding="utf-8") as fixture:
+        parser.feed(fixture.read())
+    parser.close()
+    return parser
+
+def test_spaces_match_extraction_script():
+    assert parse_fixture().spaces == EXPECTED_SPACES
+
+def test_selects():
+    parser = parse_fixture()
+    assert parser.selects == {
+        "companySiteId": [
+            ("", "Seleccione", False),
+            ("12", "Edificio Teco - Catalinas", True),
+            ("15", "Edificio Teco - Microcentro & Anexo", False)
+        ],
+        "floorId": [("101", "Subsuelo 1", True), ("102", "Subsuelo 2", False)]
+    }
+
+def test_pages():
+    assert parse_fixture().pages == {"1", "2"}
+
+def test_chunked_feed():
+    # El HTML puede llegar partido en cualquier punto
+    with open(FIXTURE, encoding="utf-8") as fixture:
+        html = fixture.read()
+    parser = ListingParser()
+    for start in range(0, len(html), 7):
+        parser.feed(html[start:start + 7])
+    parser.close()
+    assert parser.spaces == EXPECTED_SPACES
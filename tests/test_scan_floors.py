@@ -0,0 +1,61 @@
+import asyncio
+import logging
+
+import pytest
+
+pytest.importorskip("selenium")
+
+from models.schemas import SearchRequest
+from services.availability_service import AvailabilityService
+from services.search_progress import bind_progress
+
+REQUEST = SearchRequest(booking_type="parking", date="20/10/2026", start_time="08:00", end_time="18:00", building="Catalinas")
+
+@pytest.fixture
+def service():
+    service = AvailabilityService.__new__(AvailabilityService)
+    service.logger = logging.getLogger("tests")
+    service.floor_concurrency = 1
+    return service
+
+def scan_with(service, errors, failures=None):
+    """_scan_floors secuencial con un _scan_floor que falla con errors[piso]"""
+    async def scan_floor(driver, request, floor, max_pages, listing=None):
+        if floor in errors:
+            raise errors[floor]
+        return [floor]
+    service._scan_floor = scan_floor
+    events = []
+    with bind_progress(lambda event, data: events.append((event, data))):
+        spaces = asyncio.run(service._scan_floors(None, REQUEST, ["A", "B", "C"], 1, None, failures))
+    return spaces, events
+
+def test_failed_floor_is_skipped_and_reported_as_partial(service):
+    failures = {}
+    spaces, events = scan_with(service, {"B": RuntimeError("boom")}, failures)
+    assert spaces == ["A", "C"]
+    assert failures == {"B": "boom"}
+    assert events == [("partial", {"date": "20/10/2026", "building": "Catalinas", "failed_floors": {"B": "boom"}})]
+
+def test_complete_scan_is_not_partial(service):
+    spaces, events = scan_with(service, {})
+    assert spaces == ["A", "B", "C"]
+    assert events == []
+
+def test_all_floors_failing_raises(service):
+    errors = {floor: RuntimeError("boom") for floor in "ABC"}
+    with pytest.raises(Exception, match="ningún piso"):
+        scan_with(service, errors)
+
+def test_exhausted_budget_propagates(service):
+    with pytest.raises(TimeoutError):
+        scan_with(service, {"B": TimeoutError("presupuesto agotado")})
+
+def test_snapshot_write_error_does_not_fail_the_floor(service, caplog):
+    class FailingSnapshots:
+        def save_floor(self, request, floor, pages):
+            raise RuntimeError("UNIQUE constraint failed: availability_snapshots.space_id")
+    service.snapshots = FailingSnapshots()
+    with caplog.at_level(logging.WARNING, logger="tests"):
+        service._save_snapshot(REQUEST, "A", [(1, [])])
+    assert "No se pudo guardar el snapshot de A" in caplog.text
@@ -0,0 +1,123 @@
+import logging
+
+import pytest
+
+# El servicio importa selenium; sin él no hay nada que probar
+pytest.importorskip("selenium")
+
+from services.availability_service import AvailabilityService, SpaceAvailability
+
+# Espacios crudos tal como los retorna SPACES_EXTRACTION_SCRIPT (y ListingParser)
+RAW_SPACES = [
+    {
+        "id": "5001",
+        "name": "favorite_border EHOBA-SS1-014 | Cochera",
+        "blocks": [["08:00", "08:30"], ["08:30", "09:00"], ["09:30", "10:00"]]
+    },
+    {"id": "5002", "name": "EHOBA-MOTO-03 | Moto", "blocks": [["08:00", "12:00"]]},
+    {"id": "5003", "name": "EHOBA-SS1-020 | Cochera", "blocks": []},
+    {"id": "5004", "name": "EHOBA-SS1-021", "blocks": [["15:00", "15:30"], ["14:00", "14:30"]]},
+    {"id": "5005", "name": None, "blocks": [["08:00", "09:00"]]},
+    {"id": "5006", "name": "EHOBA-SS1-030 | Cochera", "blocks": [["13:00", "17:00"]]}
+]
+
+def mask(*slots):
+    return sum(1 << slot for slot in slots)
+
+EXPECTED = [
+    SpaceAvailability(
+        space_id="5001", space_name="EHOBA-SS1-014", floor="Subsuelo 1",
+        available_minutes=60, continuous_slot=True, start_time="08:00", end_time="09:00",
+        page=2, free_mask=mask(16, 17, 19)
+    ),
+    SpaceAvailability(
+        space_id="5004", space_name="EHOBA-SS1-021", floor="Subsuelo 1",
+        available_minutes=30, continuous_slot=False, start_time="14:00", end_time="14:30",
+        page=2, free_mask=mask(28, 30)
+    ),
+    SpaceAvailability(
+        space_id="5006", space_name="EHOBA-SS1-030", floor="Subsuelo 1",
+        available_minutes=240, continuous_slot=True, start_time="13:00", end_time="17:00",
+        page=2, free_mask=mask(*range(26, 34))
+    )
+]
+
+def legacy_longest_block(blocks):
+    """
+    Recorrido de bloques del _analyze_page_spaces original, copiado como referencia
+
+    Returns:
+        (inicio, fin, minutos) del bloque más largo
+    """
+    def consecutive(time1, time2):
+        hours1, minutes1 = map(int, time1.split(':'))
+        hours2, minutes2 = map(int, time2.split(':'))
+        return (hours2 * 60 + minutes2) - (hours1 * 60 + minutes1) <= 30
+
+    current_block = {"start": None, "end": None, "minutes": 0}
+    longest_block = {"start": None, "end": None, "minutes": 0}
+    for start_time, end_time in blocks:
+        if current_block["start"] is None:
+            current_block = {"start": start_time, "end": end_time, "minutes": 30}
+        elif consecutive(current_block["end"], start_time):
+            current_block["end"] = end_time
+            current_block["minutes"] += 30
+        else:
+            if current_block["minutes"] > longest_block["minutes"]:
+                longest_block = current_block.copy()
+            current_block = {"start": start_time, "end": end_time, "minutes": 30}
+    if current_block["minutes"] > longest_block["minutes"]:
+        longest_block = current_block
+    return longest_block["start"], longest_block["end"], longest_block["minutes"]
+
+# Espacios con bloques de 30 minutos, ordenados y sin huecos de exactamente 30
+# minutos: ahí el recorrido original y la máscara deben coincidir
+PARITY_SPACES = [
+    {"id": "6001", "name": "EHOBA-SS2-001 | Cochera", "blocks": [["08:00", "08:30"], ["08:30", "09:00"], ["09:00", "09:30"]]},
+    {"id": "6002", "name": "EHOBA-SS2-002 | Cochera", "blocks": [["08:00", "08:30"], ["10:00", "10:30"], ["10:30", "11:00"]]},
+    {"id": "6003", "name": "EHOBA-SS2-003 | Cochera", "blocks": [["12:00", "12:30"]]},
+    {"id": "6004", "name": "EHOBA-SS2-004 | Cochera", "blocks": [["09:00", "09:30"], ["09:30", "10:00"], ["14:00", "14:30"], ["14:30", "15:00"]]}
+]
+
+@pytest.fixture
+def service():
+    # Sin __init__: _spaces_from_raw no usa el pool ni la base
+    service = AvailabilityService.__new__(AvailabilityService)
+    service.logger = logging.getLogger("tests")
+    return service
+
+def test_spaces_from_raw(service):
+    assert service._spaces_from_raw(RAW_SPACES, "Subsuelo 1", 2) == EXPECTED
+
+def test_space_without_title_is_skipped_with_warning(service, caplog):
+    with caplog.at_level(logging.WARNING, logger="tests"):
+        spaces = service._spaces_from_raw([RAW_SPACES[4]], "Subsuelo 1", 1)
+    assert spaces == []
+    assert "Espacio sin título h5" in caplog.text
+
+def test_empty_page(service):
+    assert service._spaces_from_raw([], "Subsuelo 1", 1) == []
+
+def test_parity_with_original_merge_loop(service):
+    spaces = service._spaces_from_raw(PARITY_SPACES, "Subsuelo 2", 1)
+    assert [space.space_id for space in spaces] == [raw["id"] for raw in PARITY_SPACES]
+    for raw, space in zip(PARITY_SPACES, spaces):
+        assert (space.start_time, space.end_time, space.available_minutes) == legacy_longest_block(raw["blocks"])
+
+def test_intended_divergence_from_original_merge_loop(service):
+    # El recorrido original sobrestimaba la disponibilidad; el cambio es intencional
+    # (ver el docstring de interval_engine.blocks_to_mask)
+    spaces = {space.space_id: space for space in service._spaces_from_raw(RAW_SPACES, "Subsuelo 1", 2)}
+    legacy = {raw["id"]: legacy_longest_block(raw["blocks"]) for raw in RAW_SPACES if raw["id"] in spaces}
+
+    # Un hueco de 30 minutos (09:00-09:30) se contaba como libre
+    assert legacy["5001"] == ("08:00", "10:00", 90)
+    assert (spaces["5001"].start_time, spaces["5001"].end_time, spaces["5001"].available_minutes) == ("08:00", "09:00", 60)
+
+    # Bloques desordenados: 15:00 seguido de 14:00 se tomaba como consecutivo
+    assert legacy["5004"] == ("15:00", "14:30", 60)
+    assert (spaces["5004"].start_time, spaces["5004"].end_time, spaces["5004"].available_minutes) == ("14:00", "14:30", 30)
+
+    # Un bloque de 4 horas sumaba solo 30 minutos
+    assert legacy["5006"] == ("13:00", "17:00", 30)
+    assert (spaces["5006"].start_time, spaces["5006"].end_time, spaces["5006"].available_minutes) == ("13:00", "17:00", 240)
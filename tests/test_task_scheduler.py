@@ -0,0 +1,18 @@
+import pytest
+
+from services.task_scheduler import priority_class_for
+
+def test_default_classes():
+    assert priority_class_for("search") == "search"
+    assert priority_class_for("booking_batch") == "booking"
+
+def test_search_can_be_demoted_to_prefetch():
+    assert priority_class_for("search", "prefetch") == "prefetch"
+
+def test_search_cannot_jump_ahead_of_bookings():
+    with pytest.raises(ValueError):
+        priority_class_for("search", "booking")
+
+def test_unknown_class():
+    with pytest.raises(ValueError):
+        priority_class_for("booking", "urgent")